@@ -0,0 +1,641 @@
+from DolphinMemoryLib import Dolphin, PointerChains, build_struct, decode_string
+import json
+import os
+import sys
+import time
+
+# Everything to do with finding and reading the chaos codes that doesn't need Qt. The display in
+# CodeDisplay.py and the headless stream in CodeStream.py are both built on top of this.
+
+class ChaosLayout(object):
+    """ Where everything lives in the chaos structs of one version of the game """
+
+    # every offset and size a layout has to give, in bytes
+    FIELDS = (
+        # chaosPtrs offsets
+        "unique_string_ptr_offset", "code_container_ptr_offset", "current_time_ptr_offset",
+        # codeContainer offsets
+        "current_code_count_offset", "code_list_offset",
+        # code list entries
+        "code_size", "code_id_offset", "name_offset", "name_size", "is_active_offset",
+        "rarity_offset", "duration_offset", "time_called_offset", "p_func_offset",
+    )
+
+    # the unique string is what chaosPtrs points to first, which is both how the struct gets found
+    # and how the version gets told apart. the decoders for the code list get compiled once here
+    def __init__(self, unique_string, **offsets):
+        missing = [name for name in self.FIELDS if name not in offsets]
+        if missing:
+            raise ValueError(f"the layout for {unique_string} is missing {', '.join(missing)}")
+        self.unique_string = unique_string
+        for name in self.FIELDS:
+            setattr(self, name, offsets[name])
+        self.chaos_ptrs_size = max(self.unique_string_ptr_offset, self.code_container_ptr_offset, self.current_time_ptr_offset) + 4
+
+        # decoder for a whole code list entry, and where each field ends up in what it unpacks
+        self.code_struct, self.code_fields = self.compile((
+            ("code_id", self.code_id_offset, "B"),
+            ("name", self.name_offset, f"{self.name_size}s"),
+            ("is_active", self.is_active_offset, "B"),
+            ("rarity", self.rarity_offset, "I"),
+            ("duration", self.duration_offset, "f"),
+            ("time_called", self.time_called_offset, "f"),
+            ("p_func", self.p_func_offset, "I"),
+        ), self.code_size)
+
+        # decoder for the fields of an active code that change every time it gets activated,
+        # starting at whichever of them comes first
+        self.timer_offset = min(self.duration_offset, self.time_called_offset)
+        self.timer_struct, self.timer_fields = self.compile((
+            ("duration", self.duration_offset - self.timer_offset, "f"),
+            ("time_called", self.time_called_offset - self.timer_offset, "f"),
+        ), max(self.duration_offset, self.time_called_offset) - self.timer_offset + 4)
+
+    # builds a struct out of (name, offset, format) fields. returns it along with a dict of the
+    # position of each field in what it unpacks
+    @staticmethod
+    def compile(fields, size):
+        fields = sorted(fields, key=lambda field: field[1])
+        struct = build_struct([(offset, fmt) for _, offset, fmt in fields], size)
+        return struct, {name: i for i, (name, _, _) in enumerate(fields)}
+
+    # offsets in a json file can be given as numbers or as hex strings like "0x1F"
+    @classmethod
+    def from_dict(cls, data: dict):
+        offsets = {
+            name: int(value, 0) if isinstance(value, str) else value
+            for name, value in data.items() if name != "unique_string"
+        }
+        return cls(data["unique_string"], **offsets)
+
+
+# every known layout by its unique string. newer versions of the game can be supported by adding
+# their layout to the json file below, without touching any code
+LAYOUTS = {}
+
+def register_layout(layout: ChaosLayout):
+    LAYOUTS[layout.unique_string] = layout
+
+DEFAULT_LAYOUT = ChaosLayout(
+    "CHAOS 1.0",
+    unique_string_ptr_offset=0x0,
+    code_container_ptr_offset=0x4,
+    current_time_ptr_offset=0x8,
+    current_code_count_offset=0x0,
+    code_list_offset=0x4,
+    code_size=0x30,
+    code_id_offset=0x0,
+    name_offset=0x1,
+    name_size=0x1E,
+    is_active_offset=0x1F,
+    rarity_offset=0x20,
+    duration_offset=0x24,
+    time_called_offset=0x28,
+    p_func_offset=0x2C,
+)
+register_layout(DEFAULT_LAYOUT)
+
+# file with a list of extra layouts, each one a json object with the unique string and every field
+# in ChaosLayout.FIELDS
+CHAOS_LAYOUTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chaos_layouts.json")
+
+# runs when this module gets imported, which can be before a program has had the chance to move
+# stdout out of the way, so whatever's wrong with the file goes to stderr
+def load_layouts(path: str):
+    try:
+        with open(path, "r") as f:
+            layouts = json.load(f)
+    except OSError:
+        return
+    except ValueError as e:
+        print(f"Couldn't load the layouts in {path}: {e}", file=sys.stderr)
+        return
+    for data in layouts:
+        try:
+            register_layout(ChaosLayout.from_dict(data))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Skipping a layout in {path}: {e}", file=sys.stderr)
+
+load_layouts(CHAOS_LAYOUTS_FILE)
+
+
+# file that remembers where chaosPtrs was found for each game build
+CHAOS_PTRS_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chaos_ptrs_cache.json")
+
+# the cache is a small json file mapping game fingerprints to chaosPtrs addresses. a missing or
+# broken file just means the full scan runs again
+def load_chaos_ptrs_cache(path: str) -> dict:
+    try:
+        with open(path, "r") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def save_chaos_ptrs_cache(path: str, cache: dict):
+    try:
+        with open(path, "w") as f:
+            json.dump(cache, f, indent=4)
+    except OSError as e:
+        print(f"Couldn't save the chaosPtrs cache: {e}")
+
+# finds the address of the chaosPtrs struct which is initalized in the C++ code and the layout that
+# goes with it, or -1 and None if it isn't there. the address is fixed for a given build of the
+# game, so the one found last time is checked first, and the full scan for the unique string of
+# every known layout only runs if it doesn't point to one of them anymore. progress gets called
+# with a message and the fraction of the scan that's done as it goes along. should_scan can be
+# given to decide from the fingerprint whether the full scan is worth running at all
+def find_chaos_ptrs(memory: Dolphin, progress=None, should_scan=None):
+    fingerprint = memory.fingerprint()
+    cache = load_chaos_ptrs_cache(CHAOS_PTRS_CACHE)
+
+    cached_address = cache.get(fingerprint)
+    if isinstance(cached_address, int):
+        # one longer than the longest unique string, so a longer string can't pass for a shorter one
+        limit = max(len(unique_string) for unique_string in LAYOUTS) + 1
+        layout = LAYOUTS.get(memory.read_string_ptr(cached_address, limit))
+        if layout is not None:
+            print(f"Unique String: {layout.unique_string}, Address: {hex(cached_address)} (cached)")
+            return cached_address, layout
+    if should_scan is not None and not should_scan(fingerprint):
+        return -1, None
+
+    # the newest layouts get looked for first, all in the same copy of MEM1
+    ram = memory.read_mem1()
+    layouts = list(reversed(LAYOUTS.values()))
+    for i, layout in enumerate(layouts):
+        scan_progress = None
+        if progress is not None:
+            scan_progress = lambda fraction: progress("Scanning for SMS Chaos...", (i + fraction) / len(layouts))
+        chaos_ptrs = memory.find_string_ptr(layout.unique_string + "\0", ram, scan_progress)
+        if chaos_ptrs != -1:
+            print(f"Unique String: {layout.unique_string}, Address: {hex(chaos_ptrs)}")
+            cache[fingerprint] = chaos_ptrs
+            save_chaos_ptrs_cache(CHAOS_PTRS_CACHE, cache)
+            return chaos_ptrs, layout
+    print("No address found!")
+    return -1, None
+
+# hooks dolphin and finds chaosPtrs in it. returns the memory, the address of chaosPtrs and its
+# layout, or a message saying what went wrong. progress gets called with a message and the fraction
+# done of each step along the way. the pids in skip_pids are passed over when searching for a
+# dolphin instance, and should_scan goes on to find_chaos_ptrs. memory that was passed in is left
+# open either way, so it can be tried again
+def attach_chaos(pid=None, memory=None, skip_pids=[], progress=None, should_scan=None):
+    attached = memory is None
+    if memory is None:
+        memory = Dolphin()
+        if pid is None:
+            if progress is not None:
+                progress("Looking for dolphin...", 0.0)
+            return_flag = memory.find_dolphin(skip_pids)
+        else:
+            memory.pid = pid
+            return_flag = Dolphin.ReturnFlags.SUCCESS
+        if return_flag != Dolphin.ReturnFlags.SUCCESS:
+            print("Unsuccessful in finding a dolphin instance! Returning...")
+            return None, -1, None, "Could not find a dolphin instance!"
+
+        if progress is not None:
+            progress(f"Attaching to dolphin instance {memory.pid}...", 0.0)
+        return_flag = memory.init_shared_memory("dolphin-emu."+str(memory.pid))
+        if return_flag != Dolphin.ReturnFlags.SUCCESS:
+            print("Unsuccessful in initializing shared memory! Returning...")
+            return None, -1, None, "Could not find an SMS instance!"
+
+    chaos_ptrs, layout = find_chaos_ptrs(memory, progress, should_scan)
+    if chaos_ptrs == -1:
+        if attached:
+            memory.close_shared_memory()
+        return None, -1, None, "The current game doesn't seem to be SMS Chaos!"
+    return memory, chaos_ptrs, layout, None
+
+# the addresses the poller reads, as pointer chains from chaosPtrs. they only get resolved again
+# when one of the pointers in chaosPtrs changes, like when the game reallocates the code container
+def chaos_pointer_chains(chaos_ptrs: int, layout: ChaosLayout) -> PointerChains:
+    chains = PointerChains(chaos_ptrs, layout.chaos_ptrs_size)
+    chains.add("code_container", (layout.code_container_ptr_offset, 0))
+    chains.add("code_count", (layout.code_container_ptr_offset, layout.current_code_count_offset))
+    chains.add("code_list", (layout.code_container_ptr_offset, layout.code_list_offset))
+    chains.add("current_time", (layout.current_time_ptr_offset, 0))
+    return chains
+
+# hooks dolphin, finds the code list and returns a poller for it. if anything goes wrong the poller
+# is None and a message saying what went wrong is returned instead. pid can be passed in to skip
+# searching for a dolphin executable, like when running against the simulator in ChaosSimulator.py,
+# and memory to use one that's already hooked, like a session being replayed by SessionRecorder.py
+def hook_chaos(pid=None, scheduler=None, memory=None, progress=None, should_scan=None):
+    memory, chaos_ptrs, layout, error = attach_chaos(pid, memory, progress=progress, should_scan=should_scan)
+    if error is not None:
+        return None, error
+
+    poller = CodePoller(memory, chaos_ptrs, layout, scheduler)
+    poller.pid = pid
+    return poller, None
+
+# hooks every dolphin instance that's running SMS Chaos and returns a poller for each one, or an
+# empty list and a message if there aren't any. every poller gets its own copy of the scheduler
+def hook_all_chaos(scheduler=None, progress=None, should_scan=None):
+    if progress is not None:
+        progress("Looking for dolphin...", 0.0)
+    pids = Dolphin().find_dolphins()
+    if not pids:
+        print("Unsuccessful in finding a dolphin instance! Returning...")
+        return [], "Could not find a dolphin instance!"
+
+    pollers = []
+    for pid in pids:
+        poller, _ = hook_chaos(pid, None if scheduler is None else scheduler.copy(), progress=progress, should_scan=should_scan)
+        if poller is not None:
+            # a restarted instance comes back with a new pid, so any free one will do for a re-hook
+            poller.pid = None
+            pollers.append(poller)
+    if not pollers:
+        return [], "None of the dolphin instances seem to be running SMS Chaos!"
+    return pollers, None
+
+# keeps trying to hook the game like hook_chaos does, or like hook_all_chaos with all_instances,
+# until it works, so it can be started before dolphin or the game. between tries progress gets
+# told what went wrong, and wait gets called with the seconds to wait, returning True to give up.
+# returns the pollers, or an empty list and the last error once it gave up. the full scan of MEM1
+# backs off the same way it does for a re-hook
+def wait_for_chaos(pid=None, all_instances=False, scheduler=None, memory=None, progress=None, wait=time.sleep):
+    backoff = ScanBackoff(CodePoller.REHOOK_INTERVAL, CodePoller.MAX_SCAN_INTERVAL)
+    while True:
+        if all_instances:
+            pollers, error = hook_all_chaos(scheduler, progress, backoff.should_scan)
+        else:
+            poller, error = hook_chaos(pid, scheduler, memory, progress, backoff.should_scan)
+            pollers = [] if poller is None else [poller]
+        if error is None:
+            return pollers, None
+        if progress is not None:
+            progress(f"{error} Waiting for it to show up...", 0.0)
+        if wait(CodePoller.REHOOK_INTERVAL):
+            return [], error
+
+
+class CodeEntry(object):
+    """ The fields of a code that stay the same for as long as the game runs """
+
+    __slots__ = ("index", "code_id", "name", "rarity", "p_func")
+
+    def __init__(self, index, code_id, name, rarity, p_func):
+        self.index = index # position in the code list
+        self.code_id = code_id
+        self.name = name
+        self.rarity = rarity
+        self.p_func = p_func
+
+
+class CodeCatalog(object):
+    """ Every code in the code list, indexed by id, name and rarity """
+
+    # built once from a copy of the whole code list, which is also the only time the names get
+    # decoded. the poller only looks at the fields that change and finds the rest in here
+    def __init__(self, data: bytes, layout: ChaosLayout):
+        self.entries = []
+        self.by_id = {} # ids are a single byte, so past 256 codes they repeat
+        self.by_name = {}
+        self.by_rarity = {}
+        fields = layout.code_fields
+        for index, values in enumerate(layout.code_struct.iter_unpack(data)):
+            code_id = values[fields["code_id"]]
+            rarity = values[fields["rarity"]]
+            entry = CodeEntry(index, code_id, decode_string(values[fields["name"]]), rarity, values[fields["p_func"]])
+            self.entries.append(entry)
+            self.by_id.setdefault(code_id, []).append(entry)
+            self.by_name[entry.name] = entry
+            self.by_rarity.setdefault(rarity, []).append(entry)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ScanBackoff(object):
+    """ Decides whether scanning all of MEM1 for chaosPtrs is worth it again for a game build """
+
+    # a build that hasn't been scanned yet gets scanned straight away, and after that once every
+    # interval seconds, doubling with every scan that doesn't find anything up to max_interval.
+    # builds are told apart by their fingerprint
+    def __init__(self, interval, max_interval):
+        self.interval = interval
+        self.max_interval = max_interval
+        self.scans = {} # fingerprint -> (failed scans, perf_counter time of the next one)
+
+    # every scan that's let through counts as failed until reset gets called
+    def should_scan(self, fingerprint) -> bool:
+        now = time.perf_counter()
+        failures, next_scan = self.scans.get(fingerprint, (-1, 0.0))
+        if now < next_scan:
+            return False
+        failures += 1
+        self.scans[fingerprint] = (failures, now + min(self.interval * 2 ** min(failures, 16), self.max_interval))
+        return True
+
+    def reset(self):
+        self.scans = {}
+
+
+class PollScheduler(object):
+    """ Works out how long the code checker should wait before the next poll """
+
+    # all times are in milliseconds. right after a code changes the list is polled every frame,
+    # and while nothing happens the interval keeps doubling up to running_ceiling while the game
+    # clock moves, or up to ceiling while it's frozen in a pause menu or the window is minimized
+    def __init__(self, floor=1000/60, running_ceiling=50, ceiling=1000, backoff=2.0):
+        self.floor = floor
+        self.running_ceiling = max(floor, running_ceiling)
+        self.ceiling = max(self.running_ceiling, ceiling)
+        self.backoff = backoff
+
+        self.interval = floor
+        self.idle = False
+        self.last_time = None
+        self.last_wall_time = None
+        self.last_code_count = None
+
+    def set_idle(self, idle):
+        self.idle = idle
+
+    def copy(self):
+        """ A new scheduler with the same settings, for polling another code list """
+        return PollScheduler(self.floor, self.running_ceiling, self.ceiling, self.backoff)
+
+    # next_expiry is the game time at which the next active code runs out. when the clock is
+    # running the poll is timed to land right on it, so the deactivation shows up straight away
+    def next_interval(self, current_time, code_count, changed, next_expiry=None) -> float:
+        wall_time = time.perf_counter()
+        clock_rate = 0.0
+        if self.last_time is not None and wall_time > self.last_wall_time:
+            clock_rate = (current_time - self.last_time) / (wall_time - self.last_wall_time)
+
+        if changed or code_count != self.last_code_count:
+            self.interval = self.floor
+        elif clock_rate > 0:
+            self.interval = min(self.interval * self.backoff, self.running_ceiling)
+        else:
+            self.interval = min(self.interval * self.backoff, self.ceiling)
+
+        interval = self.ceiling if self.idle else self.interval
+        if next_expiry is not None and clock_rate > 0:
+            expiry_interval = (next_expiry - current_time) / clock_rate * 1000
+            interval = min(interval, max(self.floor, expiry_interval))
+
+        self.last_time = current_time
+        self.last_wall_time = wall_time
+        self.last_code_count = code_count
+        return interval
+
+
+class CodePoller(object):
+    """ Reads the code list and works out what changed since the last poll """
+
+    # whoever shows the codes works out the remaining times from the game clock by itself between
+    # batches, so while the clock runs and no codes change it only gets resynced every
+    # SYNC_INTERVAL seconds. the clock counts as frozen once it hasn't moved for FROZEN_AFTER
+    # seconds, which has to be longer than a frame of the game
+    SYNC_INTERVAL = 0.5
+    FROZEN_AFTER = 0.1
+
+    # while the clock is frozen, which is also what it looks like when dolphin is closed, the
+    # process and its segment get checked for every ALIVE_CHECK_INTERVAL seconds. once the game
+    # is lost a re-hook is tried every REHOOK_INTERVAL seconds. those only check the address that
+    # was cached for the build that's running, which is cheap. the full scan of MEM1 runs right
+    # away when a different build boots, and otherwise once every MAX_SCAN_INTERVAL seconds at
+    # most, backing off from REHOOK_INTERVAL, since the game could still be setting its structs up
+    ALIVE_CHECK_INTERVAL = 1.0
+    REHOOK_INTERVAL = 1.0
+    MAX_SCAN_INTERVAL = 30.0
+
+    def __init__(self, memory, chaos_ptrs, layout, scheduler=None):
+        self.memory = memory
+        self.set_chaos_ptrs(chaos_ptrs, layout)
+
+        self.scheduler = PollScheduler() if scheduler is None else scheduler
+        self.recorder = None # gets every snapshot when a session is being recorded
+        self.watches = None # a WatchRegistry for other game values, its callbacks run on the polling thread
+        self.stats = None # PerfStats that the read and decode times go to when they're turned on
+        self.session_stats = None # SessionStats that every change to the active codes goes to
+
+        self.hooked = True
+        self.pid = None # the only pid to re-hook, otherwise any dolphin instance not in skip_pids
+        self.skip_pids = []
+        self.last_alive_check = 0.0
+        self.last_rehook = 0.0
+        self.scan_backoff = ScanBackoff(self.REHOOK_INTERVAL, self.MAX_SCAN_INTERVAL)
+
+        # state as of the previous poll, which every new snapshot is compared against
+        self.snapshot_data = b""
+        self.active_codes = {}
+        self.last_time = None
+        self.last_clock_change = 0.0
+        self.last_sync = 0.0
+        self.clock_running = None
+
+        self.active_indices = [] # code list index of every active code as of the previous poll
+
+    def set_chaos_ptrs(self, chaos_ptrs, layout):
+        self.chaos_ptrs = chaos_ptrs
+        self.layout = layout
+        self.pointers = chaos_pointer_chains(chaos_ptrs, layout)
+        self.update_pointers()
+        self.code_count = self.memory.read_u32(self.pointers.address("code_count"))
+        # the pointer chaosPtrs starts with. it changes or goes away when the game gets reset or
+        # another one gets booted, so checking it each poll tells whether the hook is still good
+        self.signature = self.read_signature()
+
+    # rereads the pointers in chaosPtrs, following them again only if they changed. the catalog
+    # gets built again along with them. returns whether they changed
+    def update_pointers(self) -> bool:
+        if not self.pointers.validate(self.memory):
+            return False
+        self.catalog = None
+        self.code_container = self.pointers.address("code_container")
+        self.code_list = self.pointers.address("code_list")
+        self.current_time = self.pointers.address("current_time")
+        return True
+
+    def read_signature(self) -> bytes:
+        offset = self.layout.unique_string_ptr_offset
+        return self.pointers.block[offset:offset+4]
+
+    # copies the whole code list out in one read, which is kept in snapshot_data until the next
+    # poll, and returns the current time
+    def read_snapshot(self) -> float:
+        self.code_count = self.memory.read_u32(self.pointers.address("code_count"))
+        self.snapshot_data = self.memory.read_block(self.code_list, self.code_count * self.layout.code_size)
+        return self.memory.read_f32(self.current_time)
+
+    # returns (index, time called, duration) of every active code in snapshot_data. the is active
+    # flags of all codes get sliced out together, so only the timers of the active codes get
+    # unpacked and nothing else is touched. the catalog with the rest of the fields is built on the
+    # first decode, and again whenever the number of codes changes
+    def decode_snapshot(self) -> list:
+        layout = self.layout
+        data = self.snapshot_data
+        if self.catalog is None or len(self.catalog) != len(data) // layout.code_size:
+            self.catalog = CodeCatalog(data, layout)
+
+        active = []
+        duration_field = layout.timer_fields["duration"]
+        time_called_field = layout.timer_fields["time_called"]
+        flags = data[layout.is_active_offset::layout.code_size]
+        index = flags.find(1)
+        while index != -1:
+            timer = layout.timer_struct.unpack_from(data, index * layout.code_size + layout.timer_offset)
+            active.append((index, timer[time_called_field], timer[duration_field]))
+            index = flags.find(1, index + 1)
+        return active
+
+    # compares a snapshot against the previous one and returns the codes that were activated or
+    # had their timer changed, and the ones that were deactivated
+    def diff_snapshot(self, active):
+        active_codes = {}
+        entries = self.catalog.entries
+        for index, time_called, duration in active:
+            active_codes[entries[index].name] = (time_called, duration)
+        self.active_indices = [index for index, _, _ in active]
+
+        changed_codes = [
+            (name, time_called, duration) for name, (time_called, duration) in active_codes.items()
+            if self.active_codes.get(name) != (time_called, duration)
+        ]
+        removed_codes = [name for name in self.active_codes if name not in active_codes]
+
+        self.active_codes = active_codes
+        return changed_codes, removed_codes
+
+    def active_entries(self, rarity=None) -> list:
+        """ Catalog entries of the codes active as of the last poll, optionally only of one rarity """
+        return [
+            self.catalog.entries[index] for index in self.active_indices
+            if rarity is None or self.catalog.entries[index].rarity == rarity
+        ]
+
+    # checks that the game is still there and the pointers are up to date. this costs the single
+    # read of chaosPtrs, other than while the clock is frozen when dolphin itself gets checked on
+    # every so often. a recording carries on from wherever the pointers lead now
+    def check_hook(self, now) -> bool:
+        moved = self.update_pointers()
+        if self.read_signature() != self.signature:
+            return False
+        if moved and self.recorder is not None:
+            self.recorder.update_setup(self)
+        if not self.clock_running and now - self.last_alive_check >= self.ALIVE_CHECK_INTERVAL:
+            self.last_alive_check = now
+            return self.memory.is_alive()
+        return True
+
+    # drops the hook and returns a batch that clears every active code
+    def unhook(self, now):
+        print(f"Lost the game in dolphin instance {self.memory.pid}, waiting for it to come back...")
+        self.hooked = False
+        self.last_rehook = now
+        batch = (now, self.last_time or 0.0, False, [], list(self.active_codes))
+        # the catalog is usually gone by now, since the pointers that changed threw it away. the
+        # codes only get removed here, and their rarities are already in the session stats
+        if self.session_stats is not None:
+            self.session_stats.update(self.last_time or 0.0, [], list(self.active_codes), {})
+        self.active_codes = {}
+        self.active_indices = []
+        self.snapshot_data = b""
+        self.last_time = None
+        self.clock_running = False
+        return batch
+
+    # hooks dolphin again and finds the code list anew, releasing the old shared memory. the
+    # scheduler carries on as it was, and a recording carries on from the game that got hooked
+    def rehook(self, now) -> bool:
+        self.last_rehook = now
+        memory, chaos_ptrs, layout, error = attach_chaos(self.pid, skip_pids=self.skip_pids, should_scan=self.scan_backoff.should_scan)
+        if error is not None:
+            return False
+        self.scan_backoff.reset()
+
+        self.memory.close_shared_memory()
+        self.memory = memory
+        self.set_chaos_ptrs(chaos_ptrs, layout)
+        self.hooked = True
+        if self.recorder is not None:
+            self.recorder.update_setup(self)
+        print(f"Hooked the game in dolphin instance {memory.pid} again")
+        return True
+
+    # polls the code list once. returns the batch to send on, or None if there's nothing new, and
+    # how many milliseconds to wait before the next poll. a batch is the perf_counter time of the
+    # poll, the current time, whether the game clock is running, (name, time called, duration) of
+    # codes that were activated or had their timer changed, and names of codes that were deactivated
+    def poll(self):
+        now = time.perf_counter()
+        if not self.hooked:
+            if now - self.last_rehook < self.REHOOK_INTERVAL or not self.rehook(now):
+                return None, self.REHOOK_INTERVAL * 1000
+        elif not self.check_hook(now):
+            return self.unhook(now), self.REHOOK_INTERVAL * 1000
+
+        # the read only covers copying out of memory, and the decode everything it takes to get
+        # from that copy to what changed
+        if self.stats is not None:
+            read_start = time.perf_counter()
+        current_time = self.read_snapshot()
+        poll_time = time.perf_counter()
+        changed_codes, removed_codes = self.diff_snapshot(self.decode_snapshot())
+        if self.stats is not None:
+            self.stats.record("read_ms", (poll_time - read_start) * 1000)
+            self.stats.record("decode_ms", (time.perf_counter() - poll_time) * 1000)
+            self.stats.count("polls")
+        if self.recorder is not None:
+            self.recorder.record(poll_time, current_time, self.snapshot_data)
+        if self.watches is not None:
+            self.watches.poll(self.memory)
+        if self.session_stats is not None:
+            self.session_stats.update(current_time, changed_codes, removed_codes, self.catalog.by_name)
+
+        # the first poll has nothing to compare against, so the clock counts as frozen until it's
+        # seen moving
+        if self.last_time is not None and current_time != self.last_time:
+            self.last_clock_change = poll_time
+        clock_running = poll_time - self.last_clock_change < self.FROZEN_AFTER
+
+        # nothing gets sent while no codes change, other than when the clock starts or stops
+        # and the occasional resync while it's running
+        batch = None
+        if (changed_codes or removed_codes or clock_running != self.clock_running or
+                (clock_running and poll_time - self.last_sync >= self.SYNC_INTERVAL)):
+            batch = (poll_time, current_time, clock_running, changed_codes, removed_codes)
+            self.last_sync = poll_time
+        self.last_time = current_time
+        self.clock_running = clock_running
+
+        next_expiry = min((time_called + duration for time_called, duration in self.active_codes.values()), default=None)
+        interval = self.scheduler.next_interval(current_time, self.code_count, bool(changed_codes or removed_codes), next_expiry)
+        return batch, interval
+
+
+class MultiPoller(object):
+    """ Polls any number of code lists from a single thread, each one on its own schedule """
+
+    def __init__(self, pollers):
+        self.pollers = pollers
+        self.next_polls = [0.0] * len(pollers) # perf_counter time each poller is due next
+
+    # polls every code list that's due. returns (index of the poller, batch) for each one that had
+    # something new, and how many milliseconds to wait until the next one is due
+    def poll(self):
+        batches = []
+        now = time.perf_counter()
+        for i, poller in enumerate(self.pollers):
+            if self.next_polls[i] <= now:
+                if not poller.hooked:
+                    # don't let a lost instance re-hook one of the others
+                    poller.skip_pids = [other.memory.pid for other in self.pollers if other.hooked]
+                batch, interval = poller.poll()
+                if batch is not None:
+                    batches.append((i, batch))
+                self.next_polls[i] = now + interval / 1000
+        return batches, max(0.0, (min(self.next_polls) - time.perf_counter()) * 1000)
+
+    def set_idle(self, idle):
+        for poller in self.pollers:
+            poller.scheduler.set_idle(idle)
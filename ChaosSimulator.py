@@ -0,0 +1,159 @@
+from DolphinMemoryLib import Dolphin
+from multiprocessing import shared_memory
+import argparse
+import os
+import random
+import time
+
+# Stands in for a dolphin instance running Hyper Chaos so the display can be run and load tested
+# without the emulator. It creates a dolphin-emu.<pid> shared memory segment the size of MEM1 and
+# lays out the chaosPtrs struct, the codeContainer and the code list the same way the game does,
+# then advances the game time and activates and expires codes at random.
+class ChaosSimulator(object):
+    # the layout of the structs on the game's side. these are kept separate from the offsets the
+    # display reads with on purpose, so a mistake in either one shows up when running against this
+    UNIQUE_STRING = b"CHAOS 1.0\0"
+    CODE_SIZE = 0x30
+    CODE_ID_OFFSET = 0x0
+    NAME_OFFSET = 0x1
+    NAME_SIZE = 0x1E
+    IS_ACTIVE_OFFSET = 0x1F
+    RARITY_OFFSET = 0x20
+    DURATION_OFFSET = 0x24
+    TIME_CALLED_OFFSET = 0x28
+    P_FUNC_OFFSET = 0x2C
+
+    # where the simulated game keeps everything in MEM1
+    GAME_ID_ADDR = 0x80000000
+    UNIQUE_STRING_ADDR = 0x80400000
+    CHAOS_PTRS_ADDR = 0x80400040
+    CURRENT_TIME_ADDR = 0x80400080
+    CODE_CONTAINER_ADDR = 0x80410000
+
+    def __init__(self, code_count=64, activation_rate=0.5, min_duration=5.0, max_duration=30.0,
+                 speed=1.0, pid=None, seed=None):
+        self.code_count = code_count
+        self.activation_rate = activation_rate # average codes activated per second of game time
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.speed = speed # game seconds per real second, 0 freezes the clock like a pause menu
+        self.pid = os.getpid() if pid is None else pid
+        self.random = random.Random(seed)
+
+        self.code_list = self.CODE_CONTAINER_ADDR + 4
+        self.shm = None
+        self.memory = Dolphin()
+        self.current_time = 0.0
+        self.next_activation = 0.0
+        self.expiry_times = {} # index of every active code -> game time it runs out at
+
+    def create(self):
+        """ Create the shared memory segment and lay out the game's structs in it """
+        size = Dolphin.MEM_END - Dolphin.MEM_START
+        if self.code_list + self.code_count * self.CODE_SIZE > Dolphin.MEM_END:
+            raise ValueError(f"{self.code_count} codes don't fit in MEM1")
+
+        self.shm = shared_memory.SharedMemory(create=True, name='dolphin-emu.'+str(self.pid), size=size)
+        # the simulator writes through the same read/write api that the display reads with
+        self.memory.pid = self.pid
+        self.memory.dolphinMemory = self.shm
+        self.memory.ram = self.shm.buf
+
+        self.memory.write_ram(self.GAME_ID_ADDR - Dolphin.MEM_START, b"GMSE01")
+        self.memory.write_ram(self.UNIQUE_STRING_ADDR - Dolphin.MEM_START, self.UNIQUE_STRING)
+        self.memory.write_u32(self.CHAOS_PTRS_ADDR, self.UNIQUE_STRING_ADDR)
+        self.memory.write_u32(self.CHAOS_PTRS_ADDR + 4, self.CODE_CONTAINER_ADDR)
+        self.memory.write_u32(self.CHAOS_PTRS_ADDR + 8, self.CURRENT_TIME_ADDR)
+        self.memory.write_f32(self.CURRENT_TIME_ADDR, self.current_time)
+        self.memory.write_u32(self.CODE_CONTAINER_ADDR, self.code_count)
+
+        for i in range(self.code_count):
+            code = self.code_list + i * self.CODE_SIZE
+            name = f"Simulated Code {i}".encode('shift-jis')[:self.NAME_SIZE - 1]
+            self.memory.write_u8(code + self.CODE_ID_OFFSET, i & 0xFF)
+            self.memory.write_ram(code + self.NAME_OFFSET - Dolphin.MEM_START, name)
+            self.memory.write_u8(code + self.IS_ACTIVE_OFFSET, 0)
+            self.memory.write_u32(code + self.RARITY_OFFSET, self.random.randrange(4))
+            self.memory.write_f32(code + self.DURATION_OFFSET, 0.0)
+            self.memory.write_f32(code + self.TIME_CALLED_OFFSET, 0.0)
+            self.memory.write_u32(code + self.P_FUNC_OFFSET, 0x80300000 + i * 4)
+
+        self.schedule_activation()
+        print(f"Simulating Hyper Chaos in dolphin-emu.{self.pid} with {self.code_count} codes")
+
+    def close(self):
+        """ Release and remove the shared memory segment """
+        if self.shm is not None:
+            self.memory.reset()
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def schedule_activation(self):
+        if self.activation_rate > 0:
+            self.next_activation += self.random.expovariate(self.activation_rate)
+        else:
+            self.next_activation = float("inf")
+
+    def activate(self, index):
+        code = self.code_list + index * self.CODE_SIZE
+        duration = self.random.uniform(self.min_duration, self.max_duration)
+        self.memory.write_f32(code + self.DURATION_OFFSET, duration)
+        self.memory.write_f32(code + self.TIME_CALLED_OFFSET, self.current_time)
+        self.memory.write_u8(code + self.IS_ACTIVE_OFFSET, 1)
+        self.expiry_times[index] = self.current_time + duration
+
+    def expire(self, index):
+        code = self.code_list + index * self.CODE_SIZE
+        self.memory.write_u8(code + self.IS_ACTIVE_OFFSET, 0)
+        del self.expiry_times[index]
+
+    def step(self, dt):
+        """ Advance the game by dt real seconds """
+        self.current_time += dt * self.speed
+        self.memory.write_f32(self.CURRENT_TIME_ADDR, self.current_time)
+
+        for index, expiry_time in list(self.expiry_times.items()):
+            if self.current_time >= expiry_time:
+                self.expire(index)
+
+        while self.current_time >= self.next_activation:
+            if len(self.expiry_times) < self.code_count:
+                index = self.random.randrange(self.code_count)
+                while index in self.expiry_times:
+                    index = self.random.randrange(self.code_count)
+                self.activate(index)
+            self.schedule_activation()
+
+    def run(self, tick=1/60):
+        """ Step the game at the given tick rate until interrupted """
+        last = time.perf_counter()
+        try:
+            while True:
+                time.sleep(tick)
+                now = time.perf_counter()
+                self.step(now - last)
+                last = now
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate a dolphin instance running Hyper Chaos")
+    parser.add_argument("--codes", type=int, default=64, help="number of codes in the code list")
+    parser.add_argument("--rate", type=float, default=0.5, help="average activations per second of game time")
+    parser.add_argument("--min-duration", type=float, default=5.0, help="shortest code duration in seconds")
+    parser.add_argument("--max-duration", type=float, default=30.0, help="longest code duration in seconds")
+    parser.add_argument("--speed", type=float, default=1.0, help="game seconds per real second, 0 to pause")
+    parser.add_argument("--tick", type=float, default=1/60, help="real seconds between frames")
+    parser.add_argument("--pid", type=int, default=None, help="pid used in the segment name, defaults to this process")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random number generator")
+    args = parser.parse_args()
+
+    simulator = ChaosSimulator(args.codes, args.rate, args.min_duration, args.max_duration,
+                               args.speed, args.pid, args.seed)
+    simulator.create()
+    try:
+        simulator.run(args.tick)
+    finally:
+        simulator.close()
@@ -1,487 +1,846 @@
-from DolphinMemoryLib import Dolphin
-from PySide6.QtWidgets import *
-from PySide6.QtGui import *
-from PySide6 import QtGui
-from PySide6.QtCore import *
-import sys
-
-class CodeItemWidget(QWidget):
-    def __init__(self, code_name, time_called, duration, current_time):
-        super().__init__()
-
-        # Create main layout
-        main_layout = QHBoxLayout(self)
-
-        # Create a widget to contain the progress bar and label
-        overlay_widget = QWidget()
-        grid_layout = QGridLayout(overlay_widget)
-        grid_layout.setContentsMargins(0, 0, 0, 0)  # Remove margins
-        grid_layout.setSpacing(0)
-
-        # Create the progress bar
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setStyleSheet("""
-            QProgressBar {
-                border: 1px solid grey;
-                border-radius: 5px;
-                background-color: rgba(240, 240, 240, 100);
-            }
-            QProgressBar::chunk {
-                background-color: #4CAF50;
-                background-color: rgba(76, 175, 80, 200);
-                width: 1px;
-            }
-        """)
-
-
-        self.progress_bar.setRange(0, duration * 1000)
-        self.progress_bar.setTextVisible(False)
-        remaining_time = duration - (current_time - time_called)
-        self.progress_bar.setValue(remaining_time * 1000)
-
-        # Create the label to overlay on the progress bar
-        self.name = QLabel(code_name)
-        self.name.setAlignment(Qt.AlignCenter)  # Center the label
-        self.name.setStyleSheet("background-color: rgba(255, 255, 255, 0); font-weight: bold; font-size: 16px; color: white")  # Make label background transparent
-
-        # Add the progress bar and label to the grid layout
-        grid_layout.addWidget(self.progress_bar, 0, 0)
-        grid_layout.addWidget(self.name, 0, 0)  # Overlay label on the same grid cell
-
-        # Create remaining time label
-        self.remaining_time = QLabel(f"{remaining_time:.0f}")
-
-        # Add overlay widget (with progress bar and label) and remaining time to the main layout
-        main_layout.addWidget(overlay_widget)
-        #main_layout.addWidget(self.remaining_time)
-
-        # Optional: Adjust layout and widget styling
-        main_layout.setContentsMargins(5, 5, 5, 5)
-        self.setLayout(main_layout)
-
-    def update(self, remaining_time):
-        """ Update the progress bar value """
-        self.progress_bar.setValue(remaining_time*1000)
-        self.remaining_time.setText(f"{remaining_time:.0f}")
-
-
-class ChaosModWidget(QListWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-
-        self.setStyleSheet("background: transparent;")
-        # Disable scrolling by hiding scrollbars
-        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-
-        self.active_codes = {} # Dictionary to store the active list items by code name
-
-    def add_code_item(self, code_name, time_called, duration, current_time):
-        if code_name in self.active_codes:
-            # Update existing code item
-            item_widget, _ = self.active_codes[code_name]
-            
-            remaining_time = duration - (current_time - time_called)
-            item_widget.update(remaining_time)
-        else:
-            # Create the custom widget
-            item_widget = CodeItemWidget(code_name, time_called, duration, current_time)
-
-            # Create QListWidgetItem and set the custom widget
-            list_item = QListWidgetItem(self)
-            list_item.setSizeHint(item_widget.sizeHint())
-            self.addItem(list_item)
-            self.setItemWidget(list_item, item_widget)
-
-            # Store the widget reference
-            self.active_codes[code_name] = (item_widget, list_item)
-
-        #self.adjust_size_to_contents()
-
-    def update_code_item(self, code_name, time_called, duration, current_time):
-        """ Update the remaining time of an existing code """
-        if code_name in self.active_codes:
-            remaining_time = duration - (current_time - time_called)
-            item_widget, _ = self.active_codes[code_name]
-            item_widget.update(remaining_time)
-
-    def remove_code_item(self, code_name):
-        if code_name in self.active_codes:
-            item_widget, list_item = self.active_codes.pop(code_name)
-            # Remove the item from the QListWidget
-            row = self.row(list_item)
-            self.takeItem(row)
-            #self.adjust_size_to_contents()
-
-
-    def adjust_size_to_contents(self):
-        total_item_height = sum(self.sizeHintForRow(i) for i in range(self.count()))
-        total_height = total_item_height + self.frameWidth() * 2
-
-        width = self.sizeHintForColumn(0) + self.frameWidth() * 2
-
-        self.setFixedHeight(total_height)
-        self.setFixedWidth(width)
-        self.parent().resize(self.sizeHint())  # Adjust the window size
-
-    def mousePressEvent(self, event: QMouseEvent):
-        # Ignore mouse press events to prevent selection
-        event.ignore()
-
-    def mouseReleaseEvent(self, event: QMouseEvent):
-        # Ignore mouse release events to prevent selection
-        event.ignore()
-
-    def mouseMoveEvent(self, event: QMouseEvent):
-        # Ignore mouse move events to prevent dragging
-        event.ignore()
-
-    def dragEnterEvent(self, event):
-        # Ignore drag enter events to prevent dragging of items
-        event.ignore()
-
-    def dragMoveEvent(self, event):
-        # Ignore drag move events to prevent dragging of items
-        event.ignore()
-
-    def dropEvent(self, event):
-        # Ignore drop events to prevent dropping items
-        event.ignore()
-
-
-class CodeCheckerThread(QThread):
-    update_code_signal = Signal(str, float, float, float)
-    remove_code_signal = Signal(str)
-    finished = Signal()
-
-    def __init__(self, memory, code_container, code_list, current_time, code_count):
-        super().__init__()
-        self.memory = memory
-        self.code_container = code_container
-        self.code_list = code_list
-        self.current_time = current_time
-        self.code_count = code_count
-        self.running = True
-
-    def run(self):
-        while self.running:
-            for i in range(self.code_count):
-                offset = i * MainWindow.CODE_SIZE
-                is_active = (
-                    self.memory.read_u8(self.code_list + offset + MainWindow.IS_ACTIVE_OFFSET) == 1
-                )
-
-                name = self.memory.read_string(self.code_list + offset + MainWindow.NAME_OFFSET)
-                if is_active:
-                    time_called = self.memory.read_f32(self.code_list + offset + MainWindow.TIME_CALLED_OFFSET)
-                    duration = self.memory.read_f32(self.code_list + offset + MainWindow.DURATION_OFFSET)
-                    current_time = self.memory.read_f32(self.current_time)
-                    self.update_code_signal.emit(name, time_called, duration, current_time)
-                else:
-                    self.remove_code_signal.emit(name)
-
-            self.msleep(50)  # To avoid hogging CPU resources
-
-        self.finished.emit()
-
-    def stop(self):
-        self.running = False
-
-
-class ToolBar(QWidget):
-    close_button_clicked = Signal()
-    minimize_button_clicked = Signal()
-    maximize_button_clicked = Signal()
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-
-        self.setAttribute(Qt.WA_StyledBackground)
-
-        # Set the background color to gray
-        self.setStyleSheet("background: #a3a29d; border-radius: 10px;")
-        self.setMaximumHeight(35)
-
-        style = self.style()
-
-        # Create custom buttons for close, minimize, and maximize
-        button_layout = QHBoxLayout()
-        close_button = QPushButton()
-        close_button.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_TitleBarCloseButton))
-        close_button.clicked.connect(lambda: self.close_button_clicked.emit())
-        minimize_button = QPushButton()
-        minimize_button.clicked.connect(lambda: self.minimize_button_clicked.emit())
-        minimize_button.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_TitleBarMinButton))
-        maximize_button = QPushButton()
-        maximize_button.clicked.connect(lambda: self.maximize_button_clicked.emit())
-        maximize_button.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_TitleBarMaxButton))
-
-        # Style buttons
-        close_button.setStyleSheet("background: transparent; border: none;")
-        minimize_button.setStyleSheet("background: transparent; border: none;")
-        maximize_button.setStyleSheet("background: transparent; border: none;")
-
-        spacer = QSpacerItem(20, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
-
-        button_layout.addWidget(QLabel("SMS Chaos Code Display"))
-        button_layout.addItem(spacer)
-        button_layout.addWidget(minimize_button)
-        button_layout.addWidget(maximize_button)
-        button_layout.addWidget(close_button)
-
-        self.setLayout(button_layout)
-
-
-class Background(QWidget):
-    def __init__(self, parent=None):
-        super().__init__(parent)
-
-        self.setAttribute(Qt.WA_StyledBackground)
-        self.setStyleSheet("background: #cccbc8;")
-
-    def paintEvent(self, event):
-        super().paintEvent(event)
-        painter = QPainter(self)
-        painter.setBrush(QBrush(QColor(0, 0, 0, 100)))  # Semi-transparent color for the triangle
-        painter.setPen(Qt.NoPen)
-
-        # Draw the triangle in the bottom-right corner
-        size = self.size()
-        triangle_size = 20
-        points = [
-            QPoint(size.width() - triangle_size, size.height() - triangle_size),
-            QPoint(size.width(), size.height() - triangle_size),
-            QPoint(size.width() - triangle_size, size.height())
-        ]
-        painter.drawPolygon(points)
-
-
-class MainWindow(QMainWindow):
-    # codeContainer offsets
-    CURRENT_CODE_COUNT_OFFSET = 0x0
-    CODE_LIST_OFFSET = 0x4
-
-    # Code size
-    CODE_SIZE = 0x30
-
-    # codeListOffsets
-    CODE_ID_OFFSET = 0x0
-    NAME_OFFSET = 0x1
-    IS_ACTIVE_OFFSET = 0x1F
-    RARITY_OFFSET = 0x20
-    DURATION_OFFSET = 0x24
-    TIME_CALLED_OFFSET = 0x28
-    P_FUNC_OFFSET = 0x2C
-
-    def __init__(self, parent=None):
-        super().__init__(parent)
-
-        self.setWindowTitle("SMS Chaos Code Display")
-
-        self.setStyleSheet("""
-            border: 0px;
-            border-radius: 10px;
-        """)
-
-        status_label = QLabel()
-        self.is_error = False
-
-        self.memory = Dolphin()
-        return_flag = self.memory.find_dolphin()
-        if return_flag != Dolphin.ReturnFlags.SUCCESS:
-            print("Unsuccessful in finding a dolphin instance! Returning...")
-            status_label.setText("Could not find a dolphin instance! Restart this program once your game is running!")
-            self.setCentralWidget(status_label)
-            self.is_error = True
-            return
-
-        return_flag = self.memory.init_shared_memory("dolphin-emu."+str(self.memory.pid))
-        if return_flag != Dolphin.ReturnFlags.SUCCESS:
-            print("Unsuccessful in initializing shared memory! Returning...")
-            status_label.setText("Could not find an SMS instance! Restart this program once your game is running!")
-            self.setCentralWidget(status_label)
-            self.is_error = True
-            return
-        
-        self.chaos_ptrs = -1
-        self.find_chaos_ptrs()
-
-        if self.chaos_ptrs == -1:
-            status_label.setText("The current game doesn't seem to be SMS Chaos! Restart this program once your game is running!")
-            self.setCentralWidget(status_label)
-            self.is_error = True
-            return
-        
-        # read the vals from the struct
-        self.code_container = self.memory.read_u32(self.chaos_ptrs + 4)
-        self.current_time = self.memory.read_u32(self.chaos_ptrs + 8)
-
-        # read the vals from the codeContainer
-        self.current_code_count = self.memory.read_u32(self.code_container + self.CURRENT_CODE_COUNT_OFFSET)
-        self.code_list = self.code_container + self.CODE_LIST_OFFSET
-
-        # Set window to be transparent
-        self.setAttribute(Qt.WA_TranslucentBackground)
-
-        # Set the initial size of the window
-        self.resize(300, 600)
-
-        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
-
-        self.background_opacity_effect = QGraphicsOpacityEffect()
-        self.toolbar_opacity_effect = QGraphicsOpacityEffect()
-        self.background_opacity_effect.setOpacity(0.7)
-        self.toolbar_opacity_effect.setOpacity(1)
-
-        # Create animations for opacity change
-        self.background_opacity_animation = QPropertyAnimation(self.background_opacity_effect, b"opacity")
-        self.background_opacity_animation.setEasingCurve(QEasingCurve.InOutQuad)
-        self.background_opacity_animation.setDuration(500)  # 500ms duration
-        self.toolbar_opacity_animation = QPropertyAnimation(self.toolbar_opacity_effect, b"opacity")
-        self.toolbar_opacity_animation.setEasingCurve(QEasingCurve.InOutQuad)
-        self.toolbar_opacity_animation.setDuration(500)  # 500ms duration
-
-        self.background_widget = Background(self)
-        self.background_widget.setGraphicsEffect(self.background_opacity_effect)
-
-        self.toolbar = ToolBar(self)
-        self.toolbar.setGraphicsEffect(self.toolbar_opacity_effect)
-
-        self.list_widget = ChaosModWidget(self)
-        layout = QGridLayout()
-        layout.addWidget(self.background_widget, 0, 0, 3, 1)
-        layout.addWidget(self.toolbar, 0, 0)
-        layout.addWidget(self.list_widget, 1, 0)
-        container_widget = QWidget()
-        container_widget.setLayout(layout)
-        self.setCentralWidget(container_widget)
-
-        self.toolbar.minimize_button_clicked.connect(self.showMinimized)
-        self.toolbar.maximize_button_clicked.connect(self.showMaximized)
-
-        # Enable mouse tracking to handle dragging
-        enable_mouse_tracking(self)
-        self._is_dragging = False
-        self._drag_start_position = QPoint(0, 0)
-
-        # Add a margin for detecting the resize area
-        self._resize_margin = 10
-
-        # For resizing
-        self._is_resizing = False
-        self._resize_start_position = QPoint(0, 0)
-        self._resize_start_size = QSize(0, 0)
-
-        # Initialize and start the worker thread
-        self.thr = CodeCheckerThread(self.memory, self.code_container, self.code_list, self.current_time, self.current_code_count)
-        self.thr.update_code_signal.connect(self.list_widget.add_code_item)
-        self.thr.remove_code_signal.connect(self.list_widget.remove_code_item)
-        self.toolbar.close_button_clicked.connect(self.thr.stop)
-        self.thr.finished.connect(self.close)
-        self.thr.start()
-
-    # finds the address of the chaosPtrs struct which is initalized in the C++ code
-    def find_chaos_ptrs(self):
-        current_memory_address = self.memory.MEM_START
-        while current_memory_address < self.memory.MEM_END:
-            unique_string = self.memory.read_string_ptr(current_memory_address, 9)
-            if unique_string == "CHAOS 1.0":
-                print(f"Unique String: {unique_string}, Address: {hex(current_memory_address)}")
-                self.chaos_ptrs = current_memory_address
-                break
-            current_memory_address += 4
-        else:
-            print("No address found!")
-
-    def enterEvent(self, event: QEnterEvent):
-        if not self.is_error:
-            """When the mouse enters the window area."""
-            self.background_opacity_animation.stop()
-            self.background_opacity_animation.setStartValue(self.background_opacity_effect.opacity())
-            self.background_opacity_animation.setEndValue(0.7)  # Opacity when mouse enters
-            self.background_opacity_animation.start()
-            self.toolbar_opacity_animation.stop()
-            self.toolbar_opacity_animation.setStartValue(self.background_opacity_effect.opacity())
-            self.toolbar_opacity_animation.setEndValue(1)  # Opacity when mouse leaves
-            self.toolbar_opacity_animation.start()
-        return super().enterEvent(event)
-
-    def leaveEvent(self, event: QEvent):
-        if not self.is_error:
-            """When the mouse leaves the window area."""
-            self.background_opacity_animation.stop()
-            self.background_opacity_animation.setStartValue(self.background_opacity_effect.opacity())
-            self.background_opacity_animation.setEndValue(0.01)  # Opacity when mouse leaves
-            self.background_opacity_animation.start()
-            self.toolbar_opacity_animation.stop()
-            self.toolbar_opacity_animation.setStartValue(self.background_opacity_effect.opacity())
-            self.toolbar_opacity_animation.setEndValue(0)  # Opacity when mouse leaves
-            self.toolbar_opacity_animation.start()
-        return super().leaveEvent(event)
-    
-    def mousePressEvent(self, event: QMouseEvent):
-        if self.is_error:
-            return
-
-        """Detect if we are starting to resize."""
-        if event.button() == Qt.LeftButton:
-            # Check if mouse is near the right or bottom edge for resizing
-            if (event.position().x() >= self.background_widget.width() - self._resize_margin and 
-                event.position().y() >= self.background_widget.height() - self._resize_margin):
-                self._is_resizing = True
-                self._resize_start_position = event.globalPosition().toPoint()
-                self._resize_start_size = self.size()
-            else:
-                self._is_dragging = True
-                self._drag_start_position = event.globalPosition().toPoint()
-
-    def mouseMoveEvent(self, event: QMouseEvent):
-        if self.is_error:
-            return
-
-        size = self.size()
-        triangle_size = 28
-        if (event.position().x() >= size.width() - triangle_size and
-            event.position().y() >= size.height() - triangle_size):
-            self.setCursor(Qt.SizeFDiagCursor)
-        elif self.toolbar.rect().contains(event.position().toPoint()):
-            self.setCursor(Qt.ArrowCursor)
-        else:
-            self.setCursor(Qt.OpenHandCursor)
-
-        """Handle mouse movement for resizing or dragging."""
-        if self._is_resizing:
-            delta = event.globalPosition().toPoint() - self._resize_start_position
-            new_size = self._resize_start_size + QSize(delta.x(), delta.y())
-            self.resize(new_size.width(), new_size.height())
-        elif self._is_dragging:
-            delta = event.globalPosition().toPoint() - self._drag_start_position
-            self._drag_start_position = event.globalPosition().toPoint()
-            new_pos = self.pos() + delta
-            self.move(new_pos)
-
-    def mouseReleaseEvent(self, event: QMouseEvent):
-        if self.is_error:
-            return
-
-        """End resizing or dragging."""
-        if event.button() == Qt.LeftButton:
-            if self._is_resizing:
-                self._is_resizing = False
-            elif self._is_dragging:
-                self._is_dragging = False
-
-
-# for some reason in PySide6 you have to set mouse
-# tracking on for every widget in the hierarchy
-def enable_mouse_tracking(widget: QWidget):
-    widget.setMouseTracking(True)
-    for child in widget.findChildren(QWidget):
-        enable_mouse_tracking(child)
-
-
-if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    window = MainWindow()
-    window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+from ChaosCodes import MultiPoller, PollScheduler, wait_for_chaos
+from PerfStats import PerfStats, StatsDumper
+from PollerProcess import PollerProcess, PollerProcessError
+from SessionRecorder import SessionRecorder, open_replay
+from SessionStats import SessionStats, export_session_stats
+from PySide6.QtWidgets import *
+from PySide6.QtGui import *
+from PySide6 import QtGui
+from PySide6.QtCore import *
+import argparse
+import math
+import sys
+import threading
+import time
+
+class CodeListModel(QAbstractListModel):
+    """ The active codes, one row each in the order they were activated """
+
+    # (remaining time, duration) of the code in a row, worked out from the game time as of the last
+    # set_time so the timers don't have to be stored for every frame
+    TIMING_ROLE = Qt.UserRole
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.codes = [] # (name, time called, duration) of the code in each row
+        self.rows = {} # row of each code by name
+        self.current_time = 0.0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.codes)
+
+    def data(self, index, role=Qt.DisplayRole):
+        name, time_called, duration = self.codes[index.row()]
+        if role == Qt.DisplayRole:
+            return name
+        if role == self.TIMING_ROLE:
+            return (duration - (self.current_time - time_called), duration)
+        return None
+
+    def __contains__(self, name):
+        return name in self.rows
+
+    def __len__(self):
+        return len(self.codes)
+
+    # a code that's already in the list keeps its row and only gets its timer updated, anything
+    # else goes in at the end
+    def set_code(self, name, time_called, duration):
+        row = self.rows.get(name)
+        if row is not None:
+            self.codes[row] = (name, time_called, duration)
+            self.dataChanged.emit(self.index(row), self.index(row))
+            return
+        row = len(self.codes)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.codes.append((name, time_called, duration))
+        self.rows[name] = row
+        self.endInsertRows()
+
+    def remove_code(self, name):
+        row = self.rows.pop(name, None)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.codes[row]
+        for name, _, _ in self.codes[row:]:
+            self.rows[name] -= 1
+        self.endRemoveRows()
+
+    # moves the game time along, which every remaining time depends on
+    def set_time(self, current_time):
+        self.current_time = current_time
+        if self.codes:
+            self.dataChanged.emit(self.index(0), self.index(len(self.codes) - 1), [self.TIMING_ROLE])
+
+
+class CodeItemDelegate(QStyledItemDelegate):
+    """ Paints a code straight onto the list as a bar of its remaining time with the name on top """
+
+    MARGIN = 5
+    RADIUS = 5
+    BAR_COLOR = QColor(240, 240, 240, 100)
+    BORDER_COLOR = QColor("grey")
+    CHUNK_COLOR = QColor(76, 175, 80, 200)
+    NAME_COLOR = QColor("white")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.font = QFont()
+        self.font.setBold(True)
+        self.font.setPixelSize(16)
+        # every row is the same height, which lets the view lay them out without asking each one
+        self.row_height = QFontMetrics(self.font).height() + 2 * self.MARGIN + 4
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.row_height)
+
+    def paint(self, painter, option, index):
+        timing = index.data(CodeListModel.TIMING_ROLE)
+        if timing is None:
+            return
+        remaining_time, duration = timing
+        rect = QRectF(option.rect).adjusted(self.MARGIN, self.MARGIN, -self.MARGIN, -self.MARGIN)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(self.BORDER_COLOR)
+        painter.setBrush(self.BAR_COLOR)
+        painter.drawRoundedRect(rect, self.RADIUS, self.RADIUS)
+        if duration > 0 and remaining_time > 0:
+            chunk = rect.adjusted(1, 1, -1, -1)
+            chunk.setWidth(chunk.width() * min(remaining_time / duration, 1.0))
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(self.CHUNK_COLOR)
+            painter.drawRoundedRect(chunk, self.RADIUS - 1, self.RADIUS - 1)
+        painter.setFont(self.font)
+        painter.setPen(self.NAME_COLOR)
+        painter.drawText(rect, Qt.AlignCenter, index.data(Qt.DisplayRole))
+        painter.restore()
+
+
+class ChaosModWidget(QListView):
+    # the codes are painted by CodeItemDelegate, so the list itself only needs to stay out of the way
+    STYLE_SHEET = """
+        QListView {
+            background: transparent;
+        }
+    """
+
+    # the bars are moved along locally between polls at roughly the display's refresh rate, using
+    # the game clock as of the last poll and the rate it has been running at. this is how far
+    # ahead of the last poll that guess is allowed to go before the bars wait for the next one
+    FRAME_INTERVAL = 16
+    MAX_EXTRAPOLATION = 1.0
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.setStyleSheet(self.STYLE_SHEET)
+        # Disable scrolling by hiding scrollbars
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setFocusPolicy(Qt.NoFocus)
+
+        # only the rows that are visible get painted, and only the ones that changed get repainted.
+        # the codes are kept in the order they were activated, each one in the same row for as long
+        # as it's active
+        self.code_model = CodeListModel(self)
+        self.setModel(self.code_model)
+        self.setItemDelegate(CodeItemDelegate(self))
+        self.setUniformItemSizes(True)
+
+        self.stats = None # PerfStats that the handling and drawing times go to when they're turned on
+        self.pending_poll_time = None # poll time of the oldest batch that hasn't been painted yet
+
+        # game clock as of the last poll, and how many game seconds pass per real second
+        self.sync_time = None
+        self.sync_game_time = 0.0
+        self.clock_rate = 0.0
+
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setTimerType(Qt.PreciseTimer)
+        self.frame_timer.setInterval(self.FRAME_INTERVAL)
+        self.frame_timer.timeout.connect(self.update_frame)
+
+    def add_code_item(self, code_name, time_called, duration, current_time):
+        # Add the code at the end, or update it if it's already there
+        self.code_model.set_code(code_name, time_called, duration)
+
+    def update_code_item(self, code_name, time_called, duration, current_time):
+        """ Update the remaining time of an existing code """
+        if code_name in self.code_model:
+            self.code_model.set_code(code_name, time_called, duration)
+
+    def remove_code_item(self, code_name):
+        self.code_model.remove_code(code_name)
+
+    def apply_changes(self, poll_time, current_time, clock_running, changed_codes, removed_codes):
+        """ Apply one batch of changes from the code checker thread in a single pass """
+        if self.stats is not None:
+            handle_start = time.perf_counter()
+        self.setUpdatesEnabled(False)
+        self.sync_clock(poll_time, current_time, clock_running)
+        for code_name in removed_codes:
+            self.remove_code_item(code_name)
+        for code_name, time_called, duration in changed_codes:
+            self.add_code_item(code_name, time_called, duration, current_time)
+        # every remaining time depends on the game time, so they all move along with it
+        self.update_times(current_time)
+        self.setUpdatesEnabled(True)
+
+        if len(self.code_model) and self.clock_rate > 0:
+            self.frame_timer.start()
+        else:
+            self.frame_timer.stop()
+
+        if self.stats is not None:
+            self.stats.record("handle_ms", (time.perf_counter() - handle_start) * 1000)
+            # the latency runs until the next repaint, which only comes when something on the
+            # list changed and the window isn't minimized. while batches pile up before one, it's
+            # measured from the oldest
+            if (self.pending_poll_time is None and (changed_codes or removed_codes or len(self.code_model)) and
+                    not self.window().isMinimized()):
+                self.pending_poll_time = poll_time
+
+    # poll_time is the perf_counter time the game time was read at by the code checker thread.
+    # the game time only moves in whole frames, so the measured rate is smoothed out a bit
+    def sync_clock(self, poll_time, current_time, clock_running):
+        if not clock_running:
+            self.clock_rate = 0.0
+        elif self.clock_rate > 0 and poll_time > self.sync_time:
+            measured_rate = (current_time - self.sync_game_time) / (poll_time - self.sync_time)
+            self.clock_rate += (measured_rate - self.clock_rate) * 0.25
+        else:
+            # the clock just started moving again, so assume it runs in real time until the
+            # next poll gives something to measure against
+            self.clock_rate = 1.0
+        self.sync_time = poll_time
+        self.sync_game_time = current_time
+
+    def update_times(self, current_time):
+        self.code_model.set_time(current_time)
+
+    def update_frame(self):
+        """ Move the bars along with where the game clock should be by now """
+        now = time.perf_counter()
+        elapsed = min(now - self.sync_time, self.MAX_EXTRAPOLATION)
+        self.update_times(self.sync_game_time + elapsed * self.clock_rate)
+        if self.stats is not None:
+            self.stats.record("frame_ms", (time.perf_counter() - now) * 1000)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.stats is not None:
+            self.stats.count("repaints")
+            if self.pending_poll_time is not None:
+                self.stats.record("latency_ms", (time.perf_counter() - self.pending_poll_time) * 1000)
+                self.pending_poll_time = None
+
+    def adjust_size_to_contents(self):
+        total_item_height = sum(self.sizeHintForRow(i) for i in range(self.code_model.rowCount()))
+        total_height = total_item_height + self.frameWidth() * 2
+
+        width = self.sizeHintForColumn(0) + self.frameWidth() * 2
+
+        self.setFixedHeight(total_height)
+        self.setFixedWidth(width)
+        self.parent().resize(self.sizeHint())  # Adjust the window size
+
+    def mousePressEvent(self, event: QMouseEvent):
+        # Ignore mouse press events to prevent selection
+        event.ignore()
+
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        # Ignore mouse release events to prevent selection
+        event.ignore()
+
+    def mouseMoveEvent(self, event: QMouseEvent):
+        # Ignore mouse move events to prevent dragging
+        event.ignore()
+
+    def dragEnterEvent(self, event):
+        # Ignore drag enter events to prevent dragging of items
+        event.ignore()
+
+    def dragMoveEvent(self, event):
+        # Ignore drag move events to prevent dragging of items
+        event.ignore()
+
+    def dropEvent(self, event):
+        # Ignore drop events to prevent dropping items
+        event.ignore()
+
+
+class CodeCheckerThread(QThread):
+    # index of the dolphin instance, followed by a batch from CodePoller.poll, see there for what's in them
+    codes_changed_signal = Signal(int, float, float, bool, list, list)
+    finished = Signal()
+    # a message saying why the polling stopped by itself, after which finished doesn't get emitted
+    error_signal = Signal(str)
+
+    # every hooked dolphin instance is polled from this one thread through a MultiPoller, or read
+    # from here as the polling process publishes them through a PollerProcess
+    def __init__(self, poller, stats=None):
+        super().__init__()
+        self.poller = poller
+        self.stats = stats
+        self.running = True
+        self.wake_event = threading.Event() # lets the wait between polls be cut short
+
+    def run(self):
+        while self.running:
+            try:
+                batches, interval = self.poller.poll()
+            except PollerProcessError as e:
+                self.error_signal.emit(str(e))
+                return
+            for index, batch in batches:
+                self.codes_changed_signal.emit(index, *batch)
+            if self.stats is not None:
+                self.stats.record("batches_per_poll", len(batches))
+                self.stats.count("batches", len(batches))
+
+            self.wake_event.wait(interval / 1000)  # To avoid hogging CPU resources
+            self.wake_event.clear()
+
+        self.finished.emit()
+
+    def set_idle(self, idle):
+        """ Poll as little as possible while nobody can see the display """
+        self.poller.set_idle(idle)
+        if not idle:
+            self.wake_event.set()
+
+    def stop(self):
+        self.running = False
+        self.wake_event.set()
+
+
+class ToolBar(QWidget):
+    close_button_clicked = Signal()
+    minimize_button_clicked = Signal()
+    maximize_button_clicked = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.setAttribute(Qt.WA_StyledBackground)
+
+        # Set the background color to gray
+        self.setStyleSheet("background: #a3a29d; border-radius: 10px;")
+        self.setMaximumHeight(35)
+
+        style = self.style()
+
+        # Create custom buttons for close, minimize, and maximize
+        button_layout = QHBoxLayout()
+        close_button = QPushButton()
+        close_button.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_TitleBarCloseButton))
+        close_button.clicked.connect(lambda: self.close_button_clicked.emit())
+        minimize_button = QPushButton()
+        minimize_button.clicked.connect(lambda: self.minimize_button_clicked.emit())
+        minimize_button.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_TitleBarMinButton))
+        maximize_button = QPushButton()
+        maximize_button.clicked.connect(lambda: self.maximize_button_clicked.emit())
+        maximize_button.setIcon(style.standardIcon(QStyle.StandardPixmap.SP_TitleBarMaxButton))
+
+        # Style buttons
+        close_button.setStyleSheet("background: transparent; border: none;")
+        minimize_button.setStyleSheet("background: transparent; border: none;")
+        maximize_button.setStyleSheet("background: transparent; border: none;")
+
+        spacer = QSpacerItem(20, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
+
+        # only shown once show_stats gets called
+        self.stats_label = QLabel()
+        self.stats_label.setVisible(False)
+        self.stats_timer = QTimer(self)
+
+        button_layout.addWidget(QLabel("SMS Chaos Code Display"))
+        button_layout.addWidget(self.stats_label)
+        button_layout.addItem(spacer)
+        button_layout.addWidget(minimize_button)
+        button_layout.addWidget(maximize_button)
+        button_layout.addWidget(close_button)
+
+        self.setLayout(button_layout)
+
+    def show_stats(self, stats, interval=1000):
+        """ Show a summary of the stats next to the title, updated every interval milliseconds """
+        self.stats_label.setVisible(True)
+        self.stats_label.setText(stats.summary())
+        self.stats_timer.timeout.connect(lambda: self.stats_label.setText(stats.summary()))
+        self.stats_timer.start(interval)
+
+
+class Background(QWidget):
+    COLOR = QColor("#cccbc8")
+    RADIUS = 10
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.opacity_value = 0.7
+
+    # the background fades by painting itself with less opacity rather than through a
+    # QGraphicsOpacityEffect, which would render it offscreen first on every repaint
+    def get_opacity(self):
+        return self.opacity_value
+
+    def set_opacity(self, opacity):
+        self.opacity_value = opacity
+        self.update()
+
+    opacity = Property(float, get_opacity, set_opacity)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setOpacity(self.opacity_value)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self.COLOR)
+        painter.drawRoundedRect(self.rect(), self.RADIUS, self.RADIUS)
+
+        painter.setBrush(QBrush(QColor(0, 0, 0, 100)))  # Semi-transparent color for the triangle
+
+        # Draw the triangle in the bottom-right corner
+        size = self.size()
+        triangle_size = 20
+        points = [
+            QPoint(size.width() - triangle_size, size.height() - triangle_size),
+            QPoint(size.width(), size.height() - triangle_size),
+            QPoint(size.width() - triangle_size, size.height())
+        ]
+        painter.drawPolygon(points)
+
+
+class HookThread(QThread):
+    # a message saying what's being done and the fraction of it that's done
+    progress_signal = Signal(str, float)
+    # the pollers for every hooked dolphin instance, or a message saying what went wrong
+    hooked_signal = Signal(list, object)
+
+    # finding dolphin and scanning it for the code list happen in here, so the window can show up
+    # and be moved around straight away. it keeps trying until the game shows up, so the display
+    # can be started before it. takes the same arguments as MainWindow
+    def __init__(self, pid=None, scheduler=None, memory=None, all_instances=False, poller_process=None):
+        super().__init__()
+        self.pid = pid
+        self.scheduler = scheduler
+        self.memory = memory
+        self.all_instances = all_instances
+        self.poller_process = poller_process
+        self.stop_event = threading.Event()
+
+    def run(self):
+        progress = self.progress_signal.emit
+        if self.poller_process is not None:
+            pollers = []
+            error = self.poller_process.start(progress)
+        else:
+            pollers, error = wait_for_chaos(self.pid, self.all_instances, self.scheduler, self.memory,
+                                            progress, self.stop_event.wait)
+        self.hooked_signal.emit(pollers, error)
+
+    def stop(self):
+        """ Give up on hooking the game """
+        self.stop_event.set()
+        if self.poller_process is not None:
+            self.poller_process.cancel()
+
+
+class MainWindow(QMainWindow):
+    # emitted once the game is hooked and the codes start showing
+    hooked = Signal()
+
+    # pid can be passed in to skip searching for a dolphin executable, like when running against
+    # the simulator in ChaosSimulator.py, and memory to use one that's already hooked. with
+    # all_instances every running dolphin gets hooked and shown in its own tile. the hot paths are
+    # only measured when stats are passed in, and show_stats puts a summary of them in the toolbar.
+    # a PollerProcess passed in as poller_process does the hooking and polling in a process of
+    # its own instead, in which case its read and decode times aren't measured. the window shows
+    # up straight away with the progress of the hook, and start_time is the perf_counter time the
+    # time to its first paint and to the codes showing get measured from. session stats are kept
+    # when they're to be written to session_path, which happens on ctrl+s, or shown in a panel
+    # under the list with show_session
+    def __init__(self, parent=None, pid=None, scheduler=None, memory=None, all_instances=False,
+                 stats=None, show_stats=False, poller_process=None, start_time=None,
+                 session_path=None, show_session=False):
+        super().__init__(parent)
+        # changeEvent already gets called while the window is being set up
+        self.thr = None
+        self.stats = stats
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.first_paint = None
+        self.closing = False
+        self.polling_error = None
+        self.pollers = []
+        self.session_path = session_path
+        self.show_session = show_session
+
+        self.setWindowTitle("SMS Chaos Code Display")
+
+        self.setStyleSheet("""
+            border: 0px;
+            border-radius: 10px;
+        """)
+
+        # Set window to be transparent
+        self.setAttribute(Qt.WA_TranslucentBackground)
+
+        # Set the initial size of the window
+        self.resize(300, 600)
+
+        self.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+
+        self.background_widget = Background(self)
+
+        self.toolbar = ToolBar(self)
+        # the toolbar's buttons fade along with it, which needs an effect. it's only turned on
+        # while the toolbar isn't fully opaque, so the rest of the time it gets drawn directly
+        self.toolbar_opacity_effect = QGraphicsOpacityEffect()
+        self.toolbar_opacity_effect.setOpacity(1)
+        self.toolbar_opacity_effect.setEnabled(False)
+        self.toolbar.setGraphicsEffect(self.toolbar_opacity_effect)
+
+        # Create animations for opacity change
+        self.background_opacity_animation = QPropertyAnimation(self.background_widget, b"opacity")
+        self.background_opacity_animation.setEasingCurve(QEasingCurve.InOutQuad)
+        self.background_opacity_animation.setDuration(500)  # 500ms duration
+        self.toolbar_opacity_animation = QPropertyAnimation(self.toolbar_opacity_effect, b"opacity")
+        self.toolbar_opacity_animation.setEasingCurve(QEasingCurve.InOutQuad)
+        self.toolbar_opacity_animation.setDuration(500)  # 500ms duration
+        self.toolbar_opacity_animation.finished.connect(
+            lambda: self.toolbar_opacity_effect.setEnabled(self.toolbar_opacity_effect.opacity() < 1))
+        if stats is not None and show_stats:
+            self.toolbar.show_stats(stats)
+
+        # what the list will replace once the game is hooked
+        self.status_widget = QWidget()
+        status_layout = QVBoxLayout(self.status_widget)
+        self.status_label = QLabel("Starting up...")
+        self.status_label.setWordWrap(True)
+        self.status_label.setStyleSheet("font-weight: bold; color: white;")
+        self.status_bar = QProgressBar()
+        self.status_bar.setRange(0, 100)
+        self.status_bar.setTextVisible(False)
+        self.status_bar.setFixedHeight(8)
+        status_layout.addStretch()
+        status_layout.addWidget(self.status_label)
+        status_layout.addWidget(self.status_bar)
+        status_layout.addStretch()
+
+        self.grid_layout = QGridLayout()
+        self.grid_layout.addWidget(self.background_widget, 0, 0, 3, 1)
+        self.grid_layout.addWidget(self.toolbar, 0, 0)
+        self.grid_layout.addWidget(self.status_widget, 1, 0)
+        container_widget = QWidget()
+        container_widget.setLayout(self.grid_layout)
+        self.setCentralWidget(container_widget)
+
+        self.toolbar.minimize_button_clicked.connect(self.showMinimized)
+        self.toolbar.maximize_button_clicked.connect(self.showMaximized)
+        self.toolbar.close_button_clicked.connect(self.stop)
+
+        # Enable mouse tracking to handle dragging
+        enable_mouse_tracking(self)
+        self._is_dragging = False
+        self._drag_start_position = QPoint(0, 0)
+
+        # Add a margin for detecting the resize area
+        self._resize_margin = 10
+
+        # For resizing
+        self._is_resizing = False
+        self._resize_start_position = QPoint(0, 0)
+        self._resize_start_size = QSize(0, 0)
+
+        self.hook_thread = HookThread(pid, scheduler, memory, all_instances, poller_process)
+        self.hook_thread.progress_signal.connect(self.show_progress)
+        self.hook_thread.hooked_signal.connect(self.finish_startup)
+        self.hook_thread.start()
+
+    def show_progress(self, message, fraction):
+        self.status_label.setText(message)
+        self.status_bar.setValue(round(fraction * 100))
+
+    # swaps the progress out for the list, or for the error if the game couldn't be hooked
+    def finish_startup(self, pollers, error):
+        self.hook_thread.wait()
+        self.pollers = pollers
+        if self.closing:
+            for poller in pollers:
+                if poller is not None:
+                    poller.memory.close_shared_memory()
+            return
+        if error is not None:
+            self.status_label.setText(error)
+            self.status_bar.hide()
+            return
+
+        poller_process = self.hook_thread.poller_process
+        self.source = MultiPoller(self.pollers) if poller_process is None else poller_process
+        self.pids = poller_process.pids if poller_process is not None else [poller.memory.pid for poller in self.pollers]
+
+        self.list_widgets = [ChaosModWidget(self) for _ in self.pids]
+        self.list_widget = self.list_widgets[0]
+        for poller in self.pollers:
+            poller.stats = self.stats
+            if self.session_path is not None or self.show_session:
+                poller.session_stats = SessionStats()
+        for list_widget in self.list_widgets:
+            list_widget.stats = self.stats
+        self.grid_layout.removeWidget(self.status_widget)
+        self.status_widget.deleteLater()
+        self.list_area = self.list_widget if len(self.list_widgets) == 1 else self.build_tiles()
+        self.grid_layout.addWidget(self.list_area, 1, 0)
+        if self.show_session:
+            self.grid_layout.addWidget(self.build_session_panel(), 2, 0)
+        if self.session_path is not None:
+            self.export_shortcut = QShortcut(QKeySequence("Ctrl+S"), self)
+            self.export_shortcut.activated.connect(self.export_session)
+        enable_mouse_tracking(self)
+
+        startup_ms = (time.perf_counter() - self.start_time) * 1000
+        print(f"Started up in {startup_ms:.0f}ms, first paint after {self.first_paint:.0f}ms"
+              if self.first_paint is not None else f"Started up in {startup_ms:.0f}ms")
+        if self.stats is not None:
+            self.stats.record("startup_ms", startup_ms)
+        self.hooked.emit()
+
+        # Initialize and start the worker thread
+        self.thr = CodeCheckerThread(self.source, self.stats)
+        self.thr.codes_changed_signal.connect(self.apply_changes)
+        self.thr.finished.connect(self.polling_finished)
+        self.thr.error_signal.connect(self.show_error)
+        self.thr.start()
+        self.thr.set_idle(self.isMinimized())
+
+    # a label with the session stats of every instance, updated every interval milliseconds
+    def build_session_panel(self, interval=1000):
+        self.session_label = QLabel()
+        self.session_label.setWordWrap(True)
+        self.session_label.setStyleSheet("color: white;")
+        self.session_timer = QTimer(self)
+        self.session_timer.timeout.connect(self.update_session_panel)
+        self.session_timer.start(interval)
+        self.update_session_panel()
+        return self.session_label
+
+    def update_session_panel(self):
+        if len(self.pollers) == 1:
+            self.session_label.setText(self.pollers[0].session_stats.summary())
+        else:
+            self.session_label.setText("\n".join(
+                f"Dolphin {poller.memory.pid}: " + poller.session_stats.summary().replace("\n", ", ")
+                for poller in self.pollers))
+
+    def export_session(self):
+        """ Write the session stats of every instance to session_path """
+        if self.session_path is None or self.thr is None:
+            return
+        export_session_stats(self.session_path, [(poller.memory.pid, poller.session_stats) for poller in self.pollers])
+        print(f"Wrote the session stats to {self.session_path}")
+
+    # the polling thread finishes when stop asks it to, which closes the window, but also once it
+    # stops by itself, which leaves the error it showed up
+    def polling_finished(self):
+        if self.polling_error is None:
+            self.close()
+
+    # the codes stop changing once the polling stops by itself, so they make way for the error
+    def show_error(self, message):
+        self.polling_error = message
+        for list_widget in self.list_widgets:
+            list_widget.frame_timer.stop()
+        self.list_area.hide()
+        error_label = QLabel(message)
+        error_label.setWordWrap(True)
+        error_label.setStyleSheet("font-weight: bold; color: white;")
+        self.grid_layout.addWidget(error_label, 1, 0)
+        enable_mouse_tracking(self)
+
+    # closes the window once the polling has stopped, or straight away if it hasn't started or
+    # already stopped by itself. a hook that's still going gets given up on
+    def stop(self):
+        if self.thr is not None and self.thr.isRunning():
+            self.thr.stop()
+        else:
+            self.closing = True
+            self.hook_thread.stop()
+            self.close()
+
+    def paintEvent(self, event):
+        if self.first_paint is None:
+            self.first_paint = (time.perf_counter() - self.start_time) * 1000
+            if self.stats is not None:
+                self.stats.record("first_paint_ms", self.first_paint)
+        return super().paintEvent(event)
+
+    # lays the lists of several dolphin instances out in a grid, each one under the pid it's showing
+    def build_tiles(self):
+        tiles = QWidget()
+        grid_layout = QGridLayout(tiles)
+        grid_layout.setContentsMargins(0, 0, 0, 0)
+        columns = math.ceil(math.sqrt(len(self.list_widgets)))
+        self.tile_titles = []
+        for i, (pid, list_widget) in enumerate(zip(self.pids, self.list_widgets)):
+            title = QLabel(f"Dolphin {pid}")
+            title.setStyleSheet("font-weight: bold; color: white;")
+            self.tile_titles.append(title)
+            tile_layout = QVBoxLayout()
+            tile_layout.addWidget(title)
+            tile_layout.addWidget(list_widget)
+            grid_layout.addLayout(tile_layout, i // columns, i % columns)
+        return tiles
+
+    def apply_changes(self, index, *batch):
+        self.list_widgets[index].apply_changes(*batch)
+        # the pid changes when an instance that was restarted gets hooked again
+        if len(self.list_widgets) > 1:
+            if self.pollers:
+                self.pids[index] = self.pollers[index].memory.pid
+            self.tile_titles[index].setText(f"Dolphin {self.pids[index]}")
+
+    def changeEvent(self, event: QEvent):
+        if self.thr is not None and event.type() == QEvent.WindowStateChange:
+            self.thr.set_idle(self.isMinimized())
+        return super().changeEvent(event)
+
+    def enterEvent(self, event: QEnterEvent):
+        """When the mouse enters the window area."""
+        self.background_opacity_animation.stop()
+        self.background_opacity_animation.setStartValue(self.background_widget.opacity_value)
+        self.background_opacity_animation.setEndValue(0.7)  # Opacity when mouse enters
+        self.background_opacity_animation.start()
+        self.toolbar_opacity_animation.stop()
+        self.toolbar_opacity_effect.setEnabled(True)
+        self.toolbar_opacity_animation.setStartValue(self.toolbar_opacity_effect.opacity())
+        self.toolbar_opacity_animation.setEndValue(1)  # Opacity when mouse leaves
+        self.toolbar_opacity_animation.start()
+        return super().enterEvent(event)
+
+    def leaveEvent(self, event: QEvent):
+        """When the mouse leaves the window area."""
+        self.background_opacity_animation.stop()
+        self.background_opacity_animation.setStartValue(self.background_widget.opacity_value)
+        self.background_opacity_animation.setEndValue(0.01)  # Opacity when mouse leaves
+        self.background_opacity_animation.start()
+        self.toolbar_opacity_animation.stop()
+        self.toolbar_opacity_effect.setEnabled(True)
+        self.toolbar_opacity_animation.setStartValue(self.toolbar_opacity_effect.opacity())
+        self.toolbar_opacity_animation.setEndValue(0)  # Opacity when mouse leaves
+        self.toolbar_opacity_animation.start()
+        return super().leaveEvent(event)
+    
+    def mousePressEvent(self, event: QMouseEvent):
+        """Detect if we are starting to resize."""
+        if event.button() == Qt.LeftButton:
+            # Check if mouse is near the right or bottom edge for resizing
+            if (event.position().x() >= self.background_widget.width() - self._resize_margin and 
+                event.position().y() >= self.background_widget.height() - self._resize_margin):
+                self._is_resizing = True
+                self._resize_start_position = event.globalPosition().toPoint()
+                self._resize_start_size = self.size()
+            else:
+                self._is_dragging = True
+                self._drag_start_position = event.globalPosition().toPoint()
+
+    def mouseMoveEvent(self, event: QMouseEvent):
+        size = self.size()
+        triangle_size = 28
+        if (event.position().x() >= size.width() - triangle_size and
+            event.position().y() >= size.height() - triangle_size):
+            self.setCursor(Qt.SizeFDiagCursor)
+        elif self.toolbar.rect().contains(event.position().toPoint()):
+            self.setCursor(Qt.ArrowCursor)
+        else:
+            self.setCursor(Qt.OpenHandCursor)
+
+        """Handle mouse movement for resizing or dragging."""
+        if self._is_resizing:
+            delta = event.globalPosition().toPoint() - self._resize_start_position
+            new_size = self._resize_start_size + QSize(delta.x(), delta.y())
+            self.resize(new_size.width(), new_size.height())
+        elif self._is_dragging:
+            delta = event.globalPosition().toPoint() - self._drag_start_position
+            self._drag_start_position = event.globalPosition().toPoint()
+            new_pos = self.pos() + delta
+            self.move(new_pos)
+
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        """End resizing or dragging."""
+        if event.button() == Qt.LeftButton:
+            if self._is_resizing:
+                self._is_resizing = False
+            elif self._is_dragging:
+                self._is_dragging = False
+
+
+# for some reason in PySide6 you have to set mouse
+# tracking on for every widget in the hierarchy
+def enable_mouse_tracking(widget: QWidget):
+    widget.setMouseTracking(True)
+    for child in widget.findChildren(QWidget):
+        enable_mouse_tracking(child)
+
+
+if __name__ == '__main__':
+    start_time = time.perf_counter()
+    parser = argparse.ArgumentParser(description="Display the active Hyper Chaos codes")
+    parser.add_argument("--pid", type=int, default=None, help="pid of the dolphin instance to hook instead of searching for one")
+    parser.add_argument("--all", action="store_true", help="hook every running dolphin instance and show each one in its own tile")
+    parser.add_argument("--poll-floor", type=float, default=1000/60, help="fastest poll interval in ms, used right after a code changes")
+    parser.add_argument("--poll-ceiling", type=float, default=1000, help="slowest poll interval in ms, used while the game is paused")
+    parser.add_argument("--record", default=None, help="record the session to this file")
+    parser.add_argument("--replay", default=None, help="play back a recorded session instead of hooking dolphin")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed of --replay")
+    parser.add_argument("--loop", action="store_true", help="start --replay over once it ends")
+    parser.add_argument("--poll-process", action="store_true", help="poll the game from a separate process, so it doesn't compete with drawing the display")
+    parser.add_argument("--session-stats", default=None, help="keep stats of the codes activated over the session and write them to this file, as csv if it ends in .csv and as json otherwise, on ctrl+s and on exit")
+    parser.add_argument("--session-panel", action="store_true", help="show stats of the codes activated over the session under the list")
+    parser.add_argument("--stats", action="store_true", help="show timings of the polling and drawing in the toolbar")
+    parser.add_argument("--stats-dump", default=None, help="append the timings to this file as a line of json every --stats-interval seconds")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="seconds between lines of --stats-dump")
+    args, qt_args = parser.parse_known_args()
+    if args.all and (args.pid is not None or args.record is not None or args.replay is not None):
+        parser.error("--all can't be combined with --pid, --record or --replay")
+    if args.poll_process and (args.replay is not None or args.session_stats is not None or args.session_panel):
+        parser.error("--poll-process can't be combined with --replay, --session-stats or --session-panel")
+
+    memory = None
+    if args.replay is not None:
+        memory, replayer = open_replay(args.replay, args.speed, args.loop)
+        replayer.start()
+
+    stats = PerfStats() if args.stats or args.stats_dump is not None else None
+
+    scheduler = PollScheduler(floor=args.poll_floor, ceiling=args.poll_ceiling)
+    # the polling process records the session itself
+    poller_process = PollerProcess(args.pid, args.all, scheduler, args.record) if args.poll_process else None
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = MainWindow(pid=args.pid, scheduler=scheduler, memory=memory, all_instances=args.all,
+                        stats=stats, show_stats=args.stats, poller_process=poller_process, start_time=start_time,
+                        session_path=args.session_stats, show_session=args.session_panel)
+    recorder = SessionRecorder(args.record)
+    if args.record is not None and poller_process is None:
+        window.hooked.connect(lambda: recorder.start(window.pollers[0]))
+    dumper = None
+    if args.stats_dump is not None:
+        dumper = StatsDumper(stats, args.stats_dump, args.stats_interval)
+        dumper.start()
+    window.show()
+    exit_code = app.exec()
+    # the window can be closed while the game is still being hooked
+    window.hook_thread.stop()
+    window.hook_thread.wait()
+    window.export_session()
+    recorder.stop()
+    if poller_process is not None:
+        poller_process.stop()
+    if dumper is not None:
+        dumper.stop()
+    sys.exit(exit_code)
\ No newline at end of file
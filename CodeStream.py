@@ -0,0 +1,137 @@
+from ChaosCodes import MultiPoller, PollScheduler, hook_all_chaos, hook_chaos
+from PerfStats import PerfStats, StatsDumper
+from SessionRecorder import SessionRecorder, open_replay
+from SessionStats import SessionStats, export_session_stats
+import argparse
+import json
+import signal
+import sys
+import time
+
+# Headless version of the code display. It runs the same polling as CodeDisplay.py without
+# importing Qt at all, and writes every batch of changes as a line of json to stdout, a file or a
+# fifo, for anything that wants to follow the active codes without a window. Each line says which
+# dolphin instance it's about with its pid.
+class CodeStream(object):
+    # session stats are kept when they're to be written to session_path, which happens on exit and
+    # after every call to request_export
+    def __init__(self, pollers, output, full=False, stats=None, session_path=None):
+        self.poller = MultiPoller(pollers)
+        self.output = output
+        self.full = full # also write out every active code with each batch, not just the changes
+        self.stats = stats
+        self.session_path = session_path
+        self.export_requested = False
+        for poller in pollers:
+            poller.stats = stats
+            if session_path is not None:
+                poller.session_stats = SessionStats()
+
+    def write_batch(self, index, batch):
+        poll_time, current_time, clock_running, changed_codes, removed_codes = batch
+        record = {
+            "pid": self.poller.pollers[index].memory.pid,
+            "poll_time": poll_time,
+            "current_time": current_time,
+            "clock_running": clock_running,
+            "changed": [
+                {"name": name, "time_called": time_called, "duration": duration}
+                for name, time_called, duration in changed_codes
+            ],
+            "removed": removed_codes,
+        }
+        if self.full:
+            record["active"] = [
+                {"name": name, "time_called": time_called, "duration": duration,
+                 "remaining": duration - (current_time - time_called)}
+                for name, (time_called, duration) in self.poller.pollers[index].active_codes.items()
+            ]
+        self.output.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.output.flush()
+
+    def export_session(self):
+        """ Write the session stats of every instance to session_path """
+        if self.session_path is not None:
+            export_session_stats(self.session_path, [(poller.memory.pid, poller.session_stats) for poller in self.poller.pollers])
+
+    # safe to call from a signal handler. the stats get written after the poll that's going on,
+    # since writing them from the handler could wait on a lock the poll holds
+    def request_export(self):
+        self.export_requested = True
+
+    def run(self):
+        """ Poll and write out batches until interrupted or the reader goes away """
+        try:
+            while True:
+                batches, interval = self.poller.poll()
+                for index, batch in batches:
+                    self.write_batch(index, batch)
+                if self.stats is not None:
+                    self.stats.record("batches_per_poll", len(batches))
+                    self.stats.count("batches", len(batches))
+                if self.export_requested:
+                    self.export_requested = False
+                    self.export_session()
+                time.sleep(interval / 1000)
+        except (KeyboardInterrupt, BrokenPipeError):
+            pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Stream the active Hyper Chaos codes as newline delimited json")
+    parser.add_argument("--output", default=None, help="file or fifo to write to, defaults to stdout")
+    parser.add_argument("--full", action="store_true", help="write every active code with each batch, not just the changes")
+    parser.add_argument("--pid", type=int, default=None, help="pid of the dolphin instance to hook instead of searching for one")
+    parser.add_argument("--all", action="store_true", help="hook every running dolphin instance")
+    parser.add_argument("--poll-floor", type=float, default=1000/60, help="fastest poll interval in ms, used right after a code changes")
+    parser.add_argument("--poll-ceiling", type=float, default=1000, help="slowest poll interval in ms, used while the game is paused")
+    parser.add_argument("--record", default=None, help="record the session to this file")
+    parser.add_argument("--replay", default=None, help="play back a recorded session instead of hooking dolphin")
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed of --replay")
+    parser.add_argument("--session-stats", default=None, help="keep stats of the codes activated over the session and write them to this file on exit and on SIGUSR1, as csv if it ends in .csv and as json otherwise")
+    parser.add_argument("--stats-dump", default=None, help="append timings of the polling to this file as a line of json every --stats-interval seconds")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="seconds between lines of --stats-dump")
+    args = parser.parse_args()
+    if args.all and (args.pid is not None or args.record is not None or args.replay is not None):
+        parser.error("--all can't be combined with --pid, --record or --replay")
+
+    # the status messages go to stderr so they don't end up in the stream
+    sys.stdout, stream_output = sys.stderr, sys.stdout
+    memory = None
+    if args.replay is not None:
+        memory, replayer = open_replay(args.replay, args.speed)
+        replayer.start()
+    scheduler = PollScheduler(floor=args.poll_floor, ceiling=args.poll_ceiling)
+    if args.all:
+        pollers, error = hook_all_chaos(scheduler)
+    else:
+        poller, error = hook_chaos(args.pid, scheduler, memory)
+        pollers = [poller]
+    if error is not None:
+        print(error)
+        sys.exit(1)
+
+    recorder = SessionRecorder(args.record)
+    if args.record is not None:
+        recorder.start(pollers[0])
+    stats = None
+    if args.stats_dump is not None:
+        stats = PerfStats()
+        dumper = StatsDumper(stats, args.stats_dump, args.stats_interval)
+        dumper.start()
+    output = stream_output if args.output is None else open(args.output, "w")
+    stream = CodeStream(pollers, output, args.full, stats, args.session_stats)
+    # timeout, systemd and docker stop all end the stream with SIGTERM, which would skip the
+    # cleanup below unless it gets turned into a normal exit
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: stream.request_export())
+    try:
+        stream.run()
+    finally:
+        recorder.stop()
+        stream.export_session()
+        if stats is not None:
+            dumper.stop()
+        if output is not stream_output:
+            output.close()
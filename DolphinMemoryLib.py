@@ -1,300 +1,761 @@
-from struct import pack, unpack
-from multiprocessing import shared_memory
-import psutil
-from enum import Enum
-
-"""
-MIT License
-
-Copyright (c) 2017 aldelaro5
-
-Permission is hereby granted, free of charge, to any person obtaining a copy
-of this software and associated documentation files (the "Software"), to deal
-in the Software without restriction, including without limitation the rights
-to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
-copies of the Software, and to permit persons to whom the Software is
-furnished to do so, subject to the following conditions:
-
-The above copyright notice and this permission notice shall be included in all
-copies or substantial portions of the Software.
-
-THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
-IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
-FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
-AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
-LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
-OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
-SOFTWARE."""
-
-class Dolphin(object):
-    MEM_START = 0x80000000
-    MEM_END = 0x81800000
-
-    class ReturnFlags(Enum):
-        SUCCESS = 1
-        NO_DOLPHIN = 2
-        DOLPHIN_TAKEN = 3
-        SHM_FAIL = 4
-
-    def __init__(self):
-        self.pid = -1
-        self.dolphinMemory = None 
-        self.processMemory = None
-        
-    def reset(self):
-        self.pid = -1
-        self.dolphinMemory = None 
-        self.processMemory = None
-        
-    def find_other_hooks(self):
-        skip_pids=[]
-        name = psutil.Process().name()
-        for proc in psutil.process_iter():
-            if proc.name() == name and proc.pid != psutil.Process().pid:
-                flag = self.init_shared_memory('smso.'+str(proc.pid))
-                if flag != self.ReturnFlags.SUCCESS:
-                    return skip_pids, flag
-                taken_pid = unpack(">I", self.read_ram(0, 4))[0]
-                print(taken_pid)
-                skip_pids.append(taken_pid)
-
-        return skip_pids, self.ReturnFlags.SUCCESS
-                
-                
-    def find_dolphin(self, skip_pids=[]) -> ReturnFlags:
-        for proc in psutil.process_iter():
-            if proc.pid not in skip_pids and proc.name() in ("Dolphin.exe", "DolphinQt2.exe", "DolphinWx.exe"):
-                self.pid = proc.pid
-                break
-
-        if self.pid == -1:
-            return self.ReturnFlags.NO_DOLPHIN 
-        
-        return self.ReturnFlags.SUCCESS
-    
-    def init_shared_memory(self, shm_name, size=None):
-        if size == None:
-            if self.dolphinMemory != None:
-                self.dolphinMemory.close()
-                self.dolphinMemory = None
-            try:
-                self.dolphinMemory = shared_memory.SharedMemory(shm_name)
-                return self.ReturnFlags.SUCCESS
-            except FileNotFoundError:
-                self.dolphinMemory = None
-                return self.ReturnFlags.SHM_FAIL
-        else:
-            if self.processMemory != None:
-                self.processMemory.close()
-                self.processMemory = None
-            try:
-                self.processMemory = shared_memory.SharedMemory(create=True, name=shm_name, size=size)
-                return self.ReturnFlags.SUCCESS
-            except FileNotFoundError:
-                self.processMemory = None
-                return self.ReturnFlags.SHM_FAIL
-
-    def hook_dolphin(self):
-        skip_pids, flag = self.find_other_hooks()
-        if flag != self.ReturnFlags.SUCCESS:
-            return flag
-        flag = self.find_dolphin(skip_pids)
-        if flag != self.ReturnFlags.SUCCESS:
-            return flag
-        flag = self.init_shared_memory('dolphin-emu.'+str(self.pid))
-        if flag != self.ReturnFlags.SUCCESS:
-            return flag
-        flag = self.init_shared_memory('smso.'+str(psutil.Process().pid), 16)
-        if flag != self.ReturnFlags.SUCCESS:
-            return flag
-        self.processMemory.buf[0:4] = pack(">I", self.pid)
-        psutil.Process().nice(psutil.HIGH_PRIORITY_CLASS)
-        #psutil.Process().ionice(psutil.IOPRIO_HIGH)
-        return self.ReturnFlags.SUCCESS
-
-    # these are the underlying read and write functions that get called by all other reads and writes
-    def read_ram(self, offset, size):
-        return self.dolphinMemory.buf[offset:offset+size]
-    def write_ram(self, offset, data):
-        self.dolphinMemory.buf[offset:offset+len(data)] = data
-
-    # the rest of the functions are the specific read and write calls. I have them all as separate
-    # calls to prevent any sort of mistakes with passing in incorrect data types. 
-    # It also helps with readability in general.
-    def read_u8(self, addr):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        value = self.read_ram(addr-0x80000000, 1)
-        return unpack(">B", value)[0]
-    def read_u16(self, addr):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        value = self.read_ram(addr-0x80000000, 2)
-        return unpack(">H", value)[0]
-    def read_u32(self, addr):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        value = self.read_ram(addr-0x80000000, 4)
-        return unpack(">I", value)[0]
-    def read_u64(self, addr):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        value = self.read_ram(addr-0x80000000, 8)
-        return unpack(">Q", value)[0]
-
-    def read_s8(self, addr):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        value = self.read_ram(addr-0x80000000, 1)
-        return unpack(">b", value)[0]
-    def read_s16(self, addr):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        value = self.read_ram(addr-0x80000000, 2)
-        return unpack(">h", value)[0]
-    def read_s32(self, addr):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        value = self.read_ram(addr-0x80000000, 4)
-        return unpack(">i", value)[0]
-    def read_s64(self, addr):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        value = self.read_ram(addr-0x80000000, 8)
-        return unpack(">q", value)[0]
-
-    def read_f32(self, addr):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        value = self.read_ram(addr - 0x80000000, 4)
-        return unpack(">f", value)[0]
-    def read_f64(self, addr):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        value = self.read_ram(addr - 0x80000000, 8)
-        return unpack(">d", value)[0]
-    
-    # be super careful using this function as it doesn't do much error checking.
-    # possible errors could arise from invalid pointers or invalid strings in general
-    def read_string_ptr(self, addr_ptr: int, limit: int=50) -> str:
-        if addr_ptr < self.MEM_START or addr_ptr > self.MEM_END:
-            return ""
-
-        addr = self.read_u32(addr_ptr)
-
-        data = bytearray()
-        count = 0
-        while count < limit:
-            char = self.read_u8(addr)
-            if char == 0:
-                break
-            data.append(char)
-            addr += 1
-            count += 1
-        try:
-            return data.decode('shift-jis')
-        except UnicodeDecodeError:
-            return ""
-        
-    # be super careful using this function as it doesn't do much error checking.
-    # possible errors could arise from invalid pointers or invalid strings in general
-    def read_string(self, addr: int, limit: int=50) -> str:
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return ""
-
-        data = bytearray()
-        count = 0
-        while count < limit:
-            char = self.read_u8(addr)
-            if char == 0:
-                break
-            data.append(char)
-            addr += 1
-            count += 1
-        try:
-            return data.decode('shift-jis')
-        except UnicodeDecodeError:
-            return ""
-
-
-    def write_u8(self, addr, val):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        return self.write_ram(addr - 0x80000000, pack(">B", val))
-    def write_u16(self, addr, val):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        return self.write_ram(addr - 0x80000000, pack(">H", val))
-    def write_u32(self, addr, val):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        return self.write_ram(addr - 0x80000000, pack(">I", val))
-    def write_u64(self, addr, val):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        return self.write_ram(addr - 0x80000000, pack(">Q", val))
-
-    def write_s8(self, addr, val):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        return self.write_ram(addr - 0x80000000, pack(">b", val))
-    def write_s16(self, addr, val):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        return self.write_ram(addr - 0x80000000, pack(">h", val))
-    def write_s32(self, addr, val):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        return self.write_ram(addr - 0x80000000, pack(">i", val))
-    def write_s64(self, addr, val):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        return self.write_ram(addr - 0x80000000, pack(">q", val))
-
-    def write_f32(self, addr, val):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        return self.write_ram(addr - 0x80000000, pack(">f", val))
-    def write_f64(self, addr, val):
-        if addr < self.MEM_START or addr > self.MEM_END:
-            return 0
-        return self.write_ram(addr - 0x80000000, pack(">d", val))
-
-        
-if __name__ == "__main__":
-    dolphin = Dolphin()
-    import multiprocessing 
-    
-    if dolphin.find_dolphin():
-
-        print("Found Dolphin!")
-    else:
-        print("Didn't find Dolphin")
-
-    print(dolphin.pid)
-    
-    dolphin.init_shared_memory()
-    if dolphin.init_shared_memory():
-        print("We found MEM1 and/or MEM2!")
-    else:
-        print("We didn't find it...")
-    
-    import random 
-    randint = random.randint
-    from timeit import default_timer
-    
-    start = default_timer()
-    
-    print("Testing Shared Memory Method")
-    start = default_timer()
-    count = 500000
-    for i in range(count):
-        value = randint(0, 2**32-1)
-        dolphin.write_u32(0x80000000, value)
-        
-        result = dolphin.read_u32(0x80000000)
-        assert result == value
-    diff = default_timer()-start 
-    print(count/diff, "per sec")
-    print("time: ", diff)
-    
\ No newline at end of file
+from struct import pack, unpack, calcsize, Struct
+from multiprocessing import shared_memory, resource_tracker
+import mmap
+import os
+import sys
+import zlib
+import psutil
+from enum import Enum
+
+"""
+MIT License
+
+Copyright (c) 2017 aldelaro5
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE."""
+
+# precompiled structs for every type the read and write functions handle
+U8 = Struct(">B")
+U16 = Struct(">H")
+U32 = Struct(">I")
+U64 = Struct(">Q")
+S8 = Struct(">b")
+S16 = Struct(">h")
+S32 = Struct(">i")
+S64 = Struct(">q")
+F32 = Struct(">f")
+F64 = Struct(">d")
+
+TYPES = {
+    "u8": U8, "u16": U16, "u32": U32, "u64": U64,
+    "s8": S8, "s16": S16, "s32": S32, "s64": S64,
+    "f32": F32, "f64": F64,
+}
+
+# builds a big endian struct out of (offset, format) pairs, padding out any gaps between the
+# fields so a whole block of game memory can be decoded with a single unpack
+def build_struct(fields, size: int) -> Struct:
+    fmt = ">"
+    position = 0
+    for offset, field_fmt in sorted(fields):
+        if offset < position:
+            raise ValueError(f"field at {hex(offset)} overlaps the previous one")
+        if offset > position:
+            fmt += f"{offset - position}x"
+        fmt += field_fmt
+        position = offset + calcsize(field_fmt)
+    if size < position:
+        raise ValueError(f"fields don't fit in {hex(size)} bytes")
+    if size > position:
+        fmt += f"{size - position}x"
+    return Struct(fmt)
+
+# decodes a string that was read out of game memory, stopping at the first null byte
+def decode_string(data: bytes) -> str:
+    end = data.find(b'\0')
+    if end != -1:
+        data = data[:end]
+    try:
+        return data.decode('shift-jis')
+    except UnicodeDecodeError:
+        return ""
+
+class PointerChain(object):
+    """ An address found by following a chain of pointers from a base address """
+
+    # every offset but the last one is added to the address so far and the pointer stored there
+    # is followed, then the last one is added on. (0x4, 0x4) from base is base->+4->+4
+    def __init__(self, offsets):
+        if not offsets:
+            raise ValueError("a pointer chain needs at least one offset")
+        self.offsets = tuple(offsets)
+
+    def resolve(self, memory, base: int) -> int:
+        address = base
+        for offset in self.offsets[:-1]:
+            address = memory.read_u32(address + offset)
+        return address + self.offsets[-1]
+
+class PointerChains(object):
+    """ Named pointer chains that all start in the same block of pointers """
+
+    # the chains get resolved once and their addresses reused until one of the size bytes of
+    # pointers at base changes, so checking them costs a single read. only that first level gets
+    # checked, anything past it is expected to stay put as long as the base pointers do
+    def __init__(self, base: int, size: int):
+        self.base = base
+        self.size = size
+        self.chains = {}
+        self.addresses = {}
+        self.block = None # the pointers at base as of the last resolve
+
+    def add(self, name, offsets):
+        self.chains[name] = PointerChain(offsets)
+        self.block = None
+
+    # rereads the base pointers and resolves every chain again if they changed. returns whether
+    # the addresses were resolved again
+    def validate(self, memory) -> bool:
+        block = memory.read_block(self.base, self.size)
+        if block == self.block:
+            return False
+        self.block = block
+        self.addresses = {name: chain.resolve(memory, self.base) for name, chain in self.chains.items()}
+        return True
+
+    def address(self, name) -> int:
+        return self.addresses[name]
+
+class WatchRegistry(object):
+    """ Calls back whenever one of the watched values in game memory changes """
+
+    # the watches get grouped into spans of up to about a page, and every poll copies each span
+    # once and compares it against its copy from the previous poll. only the watches in a span that
+    # changed get compared one by one, so hundreds of watches cost about as much as a few copies
+    PAGE_SIZE = 0x1000
+
+    def __init__(self, page_size: int=PAGE_SIZE):
+        self.page_size = page_size
+        self.watches = {} # watch id -> (address, type or size, callback)
+        self.next_id = 0
+        self.spans = None # [start, size, [(watch id, offset into the span)], previous copy]
+
+    # value_type is one of the keys of TYPES, or the size of a block of raw bytes. the callback gets
+    # called with the address, the new value and the old one, which is None on the first poll
+    def watch(self, addr: int, value_type, callback) -> int:
+        if value_type not in TYPES and not isinstance(value_type, int):
+            raise ValueError(f"can't watch values of type {value_type}")
+        watch_id = self.next_id
+        self.next_id += 1
+        self.watches[watch_id] = (addr, value_type, callback)
+        self.spans = None
+        return watch_id
+
+    def unwatch(self, watch_id: int):
+        del self.watches[watch_id]
+        self.spans = None
+
+    @staticmethod
+    def value_size(value_type) -> int:
+        return TYPES[value_type].size if value_type in TYPES else value_type
+
+    # groups the watches by address, starting a new span once a watch starts a page or more after
+    # the start of the current one. watches that don't lie completely inside MEM1 are left out, so
+    # they can't make the read of a whole span fail
+    def build_spans(self):
+        spans = []
+        for watch_id in sorted(self.watches, key=lambda watch_id: self.watches[watch_id][0]):
+            addr, value_type, _ = self.watches[watch_id]
+            end = addr + self.value_size(value_type)
+            if addr < Dolphin.MEM_START or end > Dolphin.MEM_END:
+                continue
+            if spans and addr - spans[-1][0] < self.page_size:
+                span = spans[-1]
+                span[1] = max(span[1], end - span[0])
+            else:
+                span = [addr, end - addr, [], None]
+                spans.append(span)
+            span[2].append((watch_id, addr - span[0]))
+        self.spans = spans
+
+    def decode(self, value_type, block, offset):
+        if value_type in TYPES:
+            return TYPES[value_type].unpack_from(block, offset)[0]
+        return block[offset:offset+value_type]
+
+    # copies every span out of memory and calls back for each watch that changed. returns the
+    # number of callbacks made. watches outside of MEM1 never change
+    def poll(self, memory) -> int:
+        if self.spans is None:
+            self.build_spans()
+
+        calls = 0
+        for span in self.spans:
+            start, size, watches, previous = span
+            block = memory.read_block(start, size)
+            if block == previous:
+                continue
+            span[3] = block
+            if not block:
+                continue
+            for watch_id, offset in watches:
+                addr, value_type, callback = self.watches[watch_id]
+                end = offset + self.value_size(value_type)
+                if previous and block[offset:end] == previous[offset:end]:
+                    continue
+                old = self.decode(value_type, previous, offset) if previous else None
+                callback(addr, self.decode(value_type, block, offset), old)
+                calls += 1
+        return calls
+
+class Dolphin(object):
+    MEM_START = 0x80000000
+    MEM_END = 0x81800000
+
+    # regions that stay fixed for a given build of a game once it has booted. the disc header
+    # holds the game id and revision, and the start of the dol's text section covers the code
+    FINGERPRINT_REGIONS = ((0x80000000, 0x20), (0x80003100, 0x10000))
+
+    # bytes of MEM1 searched between calls to the progress callback of the scans
+    SCAN_CHUNK = 0x100000
+
+    PROCESS_NAMES = ("Dolphin.exe", "DolphinQt2.exe", "DolphinWx.exe", "dolphin-emu", "dolphin-emu-nogui")
+
+    # on linux every shared memory segment is a file in here, so dolphin's segments can be listed
+    # and mapped directly instead of searching the process list for the emulator
+    SHM_DIR = "/dev/shm"
+
+    class ReturnFlags(Enum):
+        SUCCESS = 1
+        NO_DOLPHIN = 2
+        DOLPHIN_TAKEN = 3
+        SHM_FAIL = 4
+
+    def __init__(self):
+        self.pid = -1
+        self.dolphinMemory = None 
+        self.processMemory = None
+        self.ram = None # view of dolphinMemory's buffer that all the reads and writes go through
+        
+    def reset(self):
+        self.pid = -1
+        self.dolphinMemory = None 
+        self.processMemory = None
+        self.ram = None
+
+    @classmethod
+    def has_shm_dir(cls) -> bool:
+        return sys.platform.startswith('linux') and os.path.isdir(cls.SHM_DIR)
+
+    # lists the pids in the names of the shared memory segments starting with prefix, or returns
+    # None where the segments can't be listed
+    @classmethod
+    def list_segments(cls, prefix) -> list:
+        if not cls.has_shm_dir():
+            return None
+        try:
+            names = os.listdir(cls.SHM_DIR)
+        except OSError:
+            return None
+        pids = []
+        for name in names:
+            if name.startswith(prefix) and name[len(prefix):].isdigit():
+                pids.append(int(name[len(prefix):]))
+        return sorted(pids)
+
+    # reads and writes go to the given buffer instead of dolphin's shared memory. this is how a
+    # recorded session gets played back without an emulator
+    def attach_buffer(self, buf):
+        self.reset()
+        self.ram = memoryview(buf)
+        
+    def find_other_hooks(self):
+        skip_pids=[]
+        own = psutil.Process()
+        # every running hook has an smso segment, so on linux there's no need to go through the
+        # process list for them. a segment left behind by a hook that crashed gets skipped
+        pids = self.list_segments('smso.')
+        if pids is None:
+            name = own.name()
+            pids = [proc.pid for proc in psutil.process_iter(['name']) if proc.info['name'] == name]
+        for pid in pids:
+            if pid != own.pid and psutil.pid_exists(pid):
+                flag = self.init_shared_memory('smso.'+str(pid))
+                if flag != self.ReturnFlags.SUCCESS:
+                    return skip_pids, flag
+                taken_pid = unpack(">I", self.read_ram(0, 4))[0]
+                print(taken_pid)
+                skip_pids.append(taken_pid)
+
+        return skip_pids, self.ReturnFlags.SUCCESS
+                
+                
+    def find_dolphin(self, skip_pids=[]) -> ReturnFlags:
+        pids = self.find_dolphins(skip_pids)
+        if not pids:
+            return self.ReturnFlags.NO_DOLPHIN 
+
+        self.pid = pids[0]
+        return self.ReturnFlags.SUCCESS
+
+    # returns the pid of every running dolphin instance, for hooking several of them at once. on
+    # linux these come straight from the names of the dolphin-emu segments, which also finds
+    # builds with a process name that isn't in PROCESS_NAMES. everywhere else the process list is
+    # searched, only fetching the name of each process
+    def find_dolphins(self, skip_pids=[]) -> list:
+        pids = self.list_segments('dolphin-emu.')
+        if pids is not None:
+            return [pid for pid in pids if pid not in skip_pids and psutil.pid_exists(pid)]
+        return [
+            proc.pid for proc in psutil.process_iter(['name'])
+            if proc.pid not in skip_pids and proc.info['name'] in self.PROCESS_NAMES
+        ]
+
+    # maps a segment from SHM_DIR into this process. the ram is a view straight onto the mapping,
+    # so nothing gets copied and the segment is never registered with the resource tracker
+    def map_segment(self, shm_name):
+        fd = os.open(os.path.join(self.SHM_DIR, shm_name), os.O_RDWR)
+        try:
+            return mmap.mmap(fd, 0, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+
+    def close_shared_memory(self):
+        if self.ram is not None:
+            self.ram.release()
+            self.ram = None
+        if self.dolphinMemory is not None:
+            self.dolphinMemory.close()
+            self.dolphinMemory = None
+    
+    def init_shared_memory(self, shm_name, size=None):
+        if size == None:
+            self.close_shared_memory()
+            if self.has_shm_dir():
+                try:
+                    self.dolphinMemory = self.map_segment(shm_name)
+                    self.ram = memoryview(self.dolphinMemory)
+                    return self.ReturnFlags.SUCCESS
+                except (OSError, ValueError):
+                    self.dolphinMemory = None
+                    return self.ReturnFlags.SHM_FAIL
+            try:
+                self.dolphinMemory = shared_memory.SharedMemory(shm_name)
+                self.ram = self.dolphinMemory.buf
+                # on posix python registers every segment it opens with the resource tracker,
+                # which unlinks them at exit even though they belong to dolphin
+                if os.name == 'posix':
+                    resource_tracker.unregister(self.dolphinMemory._name, "shared_memory")
+                return self.ReturnFlags.SUCCESS
+            except FileNotFoundError:
+                self.dolphinMemory = None
+                return self.ReturnFlags.SHM_FAIL
+        else:
+            if self.processMemory != None:
+                self.processMemory.close()
+                self.processMemory = None
+            try:
+                self.processMemory = shared_memory.SharedMemory(create=True, name=shm_name, size=size)
+                return self.ReturnFlags.SUCCESS
+            except FileNotFoundError:
+                self.processMemory = None
+                return self.ReturnFlags.SHM_FAIL
+
+    # whether the dolphin instance this is hooked to is still running. a restarted dolphin
+    # creates a new segment, while the one mapped here goes stale. an attached buffer never does
+    def is_alive(self) -> bool:
+        if self.dolphinMemory is None:
+            return self.ram is not None
+        if self.has_shm_dir() and not os.path.exists(os.path.join(self.SHM_DIR, 'dolphin-emu.'+str(self.pid))):
+            return False
+        return psutil.pid_exists(self.pid)
+
+    # pid can be passed in to hook a specific process, like the simulator in ChaosSimulator.py,
+    # instead of searching for a dolphin executable
+    def hook_dolphin(self, pid=None):
+        skip_pids, flag = self.find_other_hooks()
+        if flag != self.ReturnFlags.SUCCESS:
+            return flag
+        if pid is None:
+            flag = self.find_dolphin(skip_pids)
+            if flag != self.ReturnFlags.SUCCESS:
+                return flag
+        else:
+            self.pid = pid
+        flag = self.init_shared_memory('dolphin-emu.'+str(self.pid))
+        if flag != self.ReturnFlags.SUCCESS:
+            return flag
+        flag = self.init_shared_memory('smso.'+str(psutil.Process().pid), 16)
+        if flag != self.ReturnFlags.SUCCESS:
+            return flag
+        self.processMemory.buf[0:4] = pack(">I", self.pid)
+        # priority classes only exist on windows, and raising the priority anywhere else needs
+        # privileges the display usually doesn't have
+        if hasattr(psutil, 'HIGH_PRIORITY_CLASS'):
+            psutil.Process().nice(psutil.HIGH_PRIORITY_CLASS)
+        #psutil.Process().ionice(psutil.IOPRIO_HIGH)
+        return self.ReturnFlags.SUCCESS
+
+    # returns a cheap identifier for the game build that's currently running, in the form of the
+    # game id followed by a checksum of the fingerprint regions
+    def fingerprint(self) -> str:
+        checksum = 0
+        for addr, size in self.FINGERPRINT_REGIONS:
+            checksum = zlib.crc32(self.read_ram(addr - self.MEM_START, size), checksum)
+        game_id = bytes(self.read_ram(0, 6)).decode('ascii', errors='replace').strip('\0')
+        return f"{game_id}-{checksum:08x}"
+
+    # writes all of MEM1 to a file, straight out of the shared memory without copying it first. the
+    # file can be opened again with open_snapshot and compared with others through SnapshotScan
+    def save_snapshot(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.read_ram(0, self.MEM_END - self.MEM_START))
+
+    # copies all of MEM1 out in one go. scanning a local copy with the bytes methods is far faster
+    # than walking the ram a word at a time through the read functions
+    def read_mem1(self) -> bytes:
+        return bytes(self.read_ram(0, self.MEM_END - self.MEM_START))
+
+    # returns the address of every occurrence of pattern in MEM1, optionally only the ones on an
+    # aligned boundary. pass in a copy from read_mem1 to reuse it across several scans. when
+    # progress is given, the ram gets searched SCAN_CHUNK bytes at a time and progress gets called
+    # with the fraction searched so far after each one
+    def find_bytes(self, pattern: bytes, align: int=1, ram: bytes=None, progress=None) -> list:
+        if ram is None:
+            ram = self.read_mem1()
+
+        addrs = []
+        chunk = len(ram) if progress is None else self.SCAN_CHUNK
+        for start in range(0, len(ram), chunk):
+            # an occurrence starting in this chunk can run past its end
+            end = min(start + chunk + len(pattern) - 1, len(ram))
+            offset = ram.find(pattern, start, end)
+            while offset != -1:
+                if offset % align == 0:
+                    addrs.append(offset + self.MEM_START)
+                offset = ram.find(pattern, offset + 1, end)
+            if progress is not None:
+                progress(min(start + chunk, len(ram)) / len(ram))
+        return addrs
+
+    # returns the address of every aligned word in MEM1 that holds a pointer to one of the targets
+    def find_pointers_to(self, targets: list, ram: bytes=None) -> list:
+        if ram is None:
+            ram = self.read_mem1()
+
+        addrs = []
+        for target in targets:
+            addrs += self.find_bytes(pack(">I", target), 4, ram)
+        return sorted(addrs)
+
+    # finds the lowest word aligned address whose pointer leads to the given string. this gives the
+    # same result as calling read_string_ptr on every word of MEM1, but the string is located with
+    # a single pass over the ram and only the words that point at it are looked at afterwards
+    def find_string_ptr(self, string: str, ram: bytes=None, progress=None) -> int:
+        if ram is None:
+            ram = self.read_mem1()
+
+        try:
+            pattern = string.encode('shift-jis')
+        except UnicodeEncodeError:
+            return -1
+
+        ptrs = self.find_pointers_to(self.find_bytes(pattern, ram=ram, progress=progress), ram)
+        if not ptrs:
+            return -1
+        return ptrs[0]
+
+    # these are the underlying read and write functions that get called by all other reads and writes
+    def read_ram(self, offset, size):
+        return self.ram[offset:offset+size]
+    def write_ram(self, offset, data):
+        self.ram[offset:offset+len(data)] = data
+
+    # copies size bytes starting at addr in a single slice. the block has to lie completely
+    # inside MEM1, otherwise an empty block is returned
+    def read_block(self, addr, size) -> bytes:
+        if addr < self.MEM_START or addr + size > self.MEM_END:
+            return b""
+        return bytes(self.read_ram(addr - 0x80000000, size))
+
+    # reads a list of (address, type) pairs in one call, where type is one of the keys of TYPES.
+    # addresses close to each other are grouped into spans, so each span is bounds checked and
+    # copied only once and all of its values come from the same moment in time
+    def read_many(self, spec, max_gap: int=0x20) -> list:
+        values = [0] * len(spec)
+        order = sorted(range(len(spec)), key=lambda i: spec[i][0])
+
+        start = 0
+        while start < len(order):
+            span_start = spec[order[start]][0]
+            span_end = span_start + TYPES[spec[order[start]][1]].size
+            end = start + 1
+            while end < len(order) and spec[order[end]][0] <= span_end + max_gap:
+                span_end = max(span_end, spec[order[end]][0] + TYPES[spec[order[end]][1]].size)
+                end += 1
+
+            block = self.read_block(span_start, span_end - span_start)
+            for i in order[start:end]:
+                addr, value_type = spec[i]
+                if block:
+                    values[i] = TYPES[value_type].unpack_from(block, addr - span_start)[0]
+                elif addr >= self.MEM_START and addr + TYPES[value_type].size <= self.MEM_END:
+                    # the span runs off the end of MEM1, so fall back to reading this one alone.
+                    # one that doesn't fit in MEM1 itself stays 0
+                    values[i] = TYPES[value_type].unpack_from(self.ram, addr - 0x80000000)[0]
+            start = end
+
+        return values
+
+    # the rest of the functions are the specific read and write calls. I have them all as separate
+    # calls to prevent any sort of mistakes with passing in incorrect data types. 
+    # It also helps with readability in general.
+    # they unpack and pack straight from and into the shared memory without slicing it first
+    def read_u8(self, addr):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return U8.unpack_from(self.ram, addr - 0x80000000)[0]
+    def read_u16(self, addr):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return U16.unpack_from(self.ram, addr - 0x80000000)[0]
+    def read_u32(self, addr):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return U32.unpack_from(self.ram, addr - 0x80000000)[0]
+    def read_u64(self, addr):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return U64.unpack_from(self.ram, addr - 0x80000000)[0]
+
+    def read_s8(self, addr):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return S8.unpack_from(self.ram, addr - 0x80000000)[0]
+    def read_s16(self, addr):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return S16.unpack_from(self.ram, addr - 0x80000000)[0]
+    def read_s32(self, addr):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return S32.unpack_from(self.ram, addr - 0x80000000)[0]
+    def read_s64(self, addr):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return S64.unpack_from(self.ram, addr - 0x80000000)[0]
+
+    def read_f32(self, addr):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return F32.unpack_from(self.ram, addr - 0x80000000)[0]
+    def read_f64(self, addr):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return F64.unpack_from(self.ram, addr - 0x80000000)[0]
+    
+    # be super careful using this function as it doesn't do much error checking.
+    # possible errors could arise from invalid pointers or invalid strings in general
+    def read_string_ptr(self, addr_ptr: int, limit: int=50) -> str:
+        if addr_ptr < self.MEM_START or addr_ptr > self.MEM_END:
+            return ""
+
+        return self.read_string(self.read_u32(addr_ptr), limit)
+        
+    # be super careful using this function as it doesn't do much error checking.
+    # possible errors could arise from invalid pointers or invalid strings in general
+    # the whole limit is copied out in one slice, cut short at the end of MEM1, and the string ends
+    # at the first null byte in it
+    def read_string(self, addr: int, limit: int=50) -> str:
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return ""
+
+        return decode_string(bytes(self.read_ram(addr - self.MEM_START, min(limit, self.MEM_END - addr))))
+
+
+    def write_u8(self, addr, val):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return U8.pack_into(self.ram, addr - 0x80000000, val)
+    def write_u16(self, addr, val):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return U16.pack_into(self.ram, addr - 0x80000000, val)
+    def write_u32(self, addr, val):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return U32.pack_into(self.ram, addr - 0x80000000, val)
+    def write_u64(self, addr, val):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return U64.pack_into(self.ram, addr - 0x80000000, val)
+
+    def write_s8(self, addr, val):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return S8.pack_into(self.ram, addr - 0x80000000, val)
+    def write_s16(self, addr, val):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return S16.pack_into(self.ram, addr - 0x80000000, val)
+    def write_s32(self, addr, val):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return S32.pack_into(self.ram, addr - 0x80000000, val)
+    def write_s64(self, addr, val):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return S64.pack_into(self.ram, addr - 0x80000000, val)
+
+    def write_f32(self, addr, val):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return F32.pack_into(self.ram, addr - 0x80000000, val)
+    def write_f64(self, addr, val):
+        if addr < self.MEM_START or addr > self.MEM_END:
+            return 0
+        return F64.pack_into(self.ram, addr - 0x80000000, val)
+
+
+# numpy types for the keys of TYPES, all of them big endian like the game's memory
+NUMPY_TYPES = {
+    "u8": "u1", "u16": ">u2", "u32": ">u4", "u64": ">u8",
+    "s8": "i1", "s16": ">i2", "s32": ">i4", "s64": ">i8",
+    "f32": ">f4", "f64": ">f8",
+}
+
+# numpy is only needed for comparing snapshots, so it only gets imported once that's done
+def import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("comparing snapshots needs numpy, install it with: py -m pip install numpy")
+    return numpy
+
+# maps a snapshot saved with Dolphin.save_snapshot into memory without reading it in
+def open_snapshot(path: str):
+    numpy = import_numpy()
+    return numpy.memmap(path, dtype="u1", mode="r")
+
+class SnapshotScan(object):
+    """ Narrows down the values in MEM1 that behave a certain way across snapshots, like a cheat scanner """
+
+    # every aligned value of the given type starts out as a candidate, and each call to narrow
+    # keeps only the ones that pass its condition. snapshots can be paths of saved snapshots,
+    # arrays from open_snapshot or anything else that holds the bytes of MEM1
+    CONDITIONS = ("changed", "unchanged", "increased", "decreased", "equals", "flipped")
+
+    def __init__(self, snapshot, value_type: str="u32"):
+        self.numpy = import_numpy()
+        self.dtype = self.numpy.dtype(NUMPY_TYPES[value_type])
+        self.values = self.view(snapshot)
+        self.candidates = None # index of every candidate, None while they're all still candidates
+
+    def view(self, snapshot):
+        if isinstance(snapshot, str):
+            snapshot = open_snapshot(snapshot)
+        size = len(snapshot) - len(snapshot) % self.dtype.itemsize
+        return self.numpy.frombuffer(snapshot, dtype=self.dtype, count=size // self.dtype.itemsize)
+
+    # compares the candidates in a new snapshot against their values in the last one. equals checks
+    # against value, within tolerance, and flipped means going from 0 to 1. without a new snapshot
+    # equals gets checked against the last one, for narrowing down by value at the start, while
+    # the other conditions need something to compare with. returns the number of candidates left
+    def narrow(self, condition: str, snapshot=None, value=None, tolerance: float=0.0) -> int:
+        if condition not in self.CONDITIONS:
+            raise ValueError(f"unknown condition {condition}, it has to be one of {', '.join(self.CONDITIONS)}")
+        if snapshot is None and condition != "equals":
+            raise ValueError(f"{condition} compares two snapshots, so it needs a new one")
+        old = self.values
+        new = old
+        if snapshot is not None:
+            new = self.view(snapshot)
+            if self.candidates is not None:
+                new = new[self.candidates]
+
+        # plenty of words in MEM1 read as nan when taken as floats, which is fine to compare
+        with self.numpy.errstate(invalid="ignore"):
+            if condition == "changed":
+                mask = new != old
+            elif condition == "unchanged":
+                mask = new == old
+            elif condition == "increased":
+                mask = new > old
+            elif condition == "decreased":
+                mask = new < old
+            elif condition == "equals":
+                # compared against both ends instead of subtracting, which wraps around for the unsigned types
+                mask = (new >= value - tolerance) & (new <= value + tolerance) if tolerance else new == value
+            else:
+                mask = (old == 0) & (new == 1)
+
+        indices = self.numpy.flatnonzero(mask)
+        self.candidates = indices if self.candidates is None else self.candidates[indices]
+        self.values = new[indices]
+        return len(self.candidates)
+
+    def addresses(self) -> list:
+        """ Address of every candidate that's left """
+        if self.candidates is None:
+            return list(range(Dolphin.MEM_START, Dolphin.MEM_START + len(self.values) * self.dtype.itemsize, self.dtype.itemsize))
+        return (self.candidates * self.dtype.itemsize + Dolphin.MEM_START).tolist()
+
+        
+if __name__ == "__main__":
+    import sys
+    dolphin = Dolphin()
+
+    # a pid can be given to benchmark against a specific instance, like the simulator
+    if len(sys.argv) > 1:
+        dolphin.pid = int(sys.argv[1])
+        print("Using pid", dolphin.pid)
+    elif dolphin.find_dolphin() == Dolphin.ReturnFlags.SUCCESS:
+        print("Found Dolphin!")
+    else:
+        print("Didn't find Dolphin")
+        sys.exit(1)
+
+    print(dolphin.pid)
+    
+    if dolphin.init_shared_memory('dolphin-emu.'+str(dolphin.pid)) == Dolphin.ReturnFlags.SUCCESS:
+        print("We found MEM1 and/or MEM2!")
+    else:
+        print("We didn't find it...")
+        sys.exit(1)
+    
+    import random 
+    randint = random.randint
+    from timeit import default_timer
+    
+    start = default_timer()
+    
+    print("Testing Shared Memory Method")
+    start = default_timer()
+    count = 500000
+    for i in range(count):
+        value = randint(0, 2**32-1)
+        dolphin.write_u32(0x80000000, value)
+        
+        result = dolphin.read_u32(0x80000000)
+        assert result == value
+    diff = default_timer()-start 
+    print(count/diff, "per sec")
+    print("time: ", diff)
+
+    print("Testing read_many")
+    spec = [(0x80000000 + i * 4, "u32") for i in range(64)]
+    count = 20000
+    start = default_timer()
+    for i in range(count):
+        dolphin.read_many(spec)
+    diff = default_timer()-start
+    print(count * len(spec)/diff, "values per sec")
+    print("time: ", diff)
+
+    print("Testing WatchRegistry")
+    watches = WatchRegistry()
+    for i in range(500):
+        watches.watch(0x80000000 + randint(0, 0x17FFFF) * 4, "u32", lambda addr, value, old: None)
+    count = 2000
+    start = default_timer()
+    for i in range(count):
+        watches.poll(dolphin)
+    diff = default_timer()-start
+    print(count/diff, "polls of", len(watches.watches), "watches in", len(watches.spans), "spans per sec")
+    print("time: ", diff)
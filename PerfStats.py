@@ -0,0 +1,165 @@
+import bisect
+import json
+import threading
+import time
+
+# Instrumentation for the polling and drawing paths. Everything that gets measured is counted into
+# histograms with fixed buckets, so recording a value is a bisect and an increment no matter how
+# long the display runs. Whoever records checks their stats attribute against None first, which is
+# all it costs while the stats are turned off.
+
+# upper bounds of the buckets in milliseconds, from 10us up to a second in steps of about 1.4x
+TIME_BUCKETS = tuple(round(0.01 * 2 ** (i / 2), 4) for i in range(34))
+# upper bounds of the buckets in milliseconds for startup, from 50ms up to about 30 seconds
+STARTUP_BUCKETS = tuple(round(50 * 2 ** (i / 2)) for i in range(19))
+# upper bounds of the buckets for things that get counted, like batches per poll
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64)
+
+# every histogram that gets recorded and the buckets it uses
+METRICS = {
+    "read_ms": TIME_BUCKETS, # copying the code list and game time out of memory
+    "decode_ms": TIME_BUCKETS, # unpacking the copy and working out which codes changed
+    "batches_per_poll": COUNT_BUCKETS, # batches sent on to the display or stream by one poll
+    "latency_ms": TIME_BUCKETS, # from reading the game time to the display first repainting with the batch
+    "handle_ms": TIME_BUCKETS, # applying a batch to the list on the gui thread
+    "frame_ms": TIME_BUCKETS, # moving the bars along between polls
+    "first_paint_ms": STARTUP_BUCKETS, # from starting up to the window first getting painted
+    "startup_ms": STARTUP_BUCKETS, # from starting up to the game being hooked and the codes showing
+}
+
+# things that only get counted
+COUNTERS = ("polls", "batches", "repaints")
+
+
+class Histogram(object):
+    """ Counts values into fixed buckets """
+
+    def __init__(self, bounds):
+        self.bounds = bounds # upper bound of each bucket, anything bigger goes into one more at the end
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    # the upper bound of the bucket the given fraction of values fall into, capped at the biggest
+    # value seen. values past the last bucket only have that maximum to go by
+    def percentile(self, fraction) -> float:
+        if self.count == 0:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target and count:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+            "buckets": self.bounds,
+            "counts": self.counts,
+        }
+
+
+class PerfStats(object):
+    """ Histograms and counters for every metric, shared by the polling thread and the gui thread """
+
+    # each histogram is only ever recorded to from one thread, so there's no locking. a dump taken
+    # from another thread can be off by the few values recorded while it was being taken
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.histograms = {name: Histogram(bounds) for name, bounds in METRICS.items()}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def record(self, name, value):
+        self.histograms[name].record(value)
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def to_dict(self) -> dict:
+        return {
+            "uptime": time.perf_counter() - self.start_time,
+            "counters": dict(self.counters),
+            "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
+
+    def summary(self) -> str:
+        """ A single line for the stats panel """
+        read = self.histograms["read_ms"]
+        latency = self.histograms["latency_ms"]
+        uptime = time.perf_counter() - self.start_time
+        return (f"read {read.percentile(0.5):.2f}/{read.percentile(0.95):.2f}ms  "
+                f"latency {latency.percentile(0.5):.1f}/{latency.percentile(0.95):.1f}ms  "
+                f"{self.counters['polls'] / uptime:.0f} polls/s  "
+                f"{self.counters['repaints'] / uptime:.0f} repaints/s")
+
+
+class StatsDumper(object):
+    """ Writes the stats out as a line of json every interval seconds """
+
+    def __init__(self, stats, path, interval=5.0):
+        self.stats = stats
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        with open(self.path, "a") as f:
+            # the last dump happens on the way out, so short runs still get one
+            while not self.stop_event.wait(self.interval):
+                self.dump(f)
+            self.dump(f)
+
+    def dump(self, f):
+        record = {"time": time.time()}
+        record.update(self.stats.to_dict())
+        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        f.flush()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Summarize a stats dump written with --stats")
+    parser.add_argument("path", help="stats dump to look at")
+    args = parser.parse_args()
+
+    with open(args.path, "r") as f:
+        lines = f.readlines()
+    if not lines:
+        print("The dump is empty")
+    else:
+        last = json.loads(lines[-1])
+        print(f"Uptime: {last['uptime']:.1f}s")
+        for name, value in last["counters"].items():
+            print(f"{name}: {value}")
+        for name, histogram in last["histograms"].items():
+            print(f"{name}: mean {histogram['mean']:.3f} p50 {histogram['p50']} p95 {histogram['p95']} "
+                  f"p99 {histogram['p99']} max {histogram['max']:.3f} ({histogram['count']} values)")
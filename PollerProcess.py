@@ -0,0 +1,314 @@
+from ChaosCodes import MultiPoller, wait_for_chaos
+from SessionRecorder import SessionRecorder
+from multiprocessing import shared_memory
+from struct import Struct
+import contextlib
+import multiprocessing
+import struct
+import sys
+
+# Runs the polling in a process of its own, so reading and decoding the code list doesn't compete
+# with Qt for the interpreter lock of the display. The polling process publishes every batch into a
+# ring of fixed-size slots in shared memory, and the display reads them straight out of it.
+#
+# The ring starts with a RING_HEADER holding the number of batches published so far, followed by
+# SLOTS slots of SLOT_SIZE bytes, batch n going into slot n % SLOTS. Each slot starts with a SLOT
+# header holding a sequence number and the size of the batch in it. The sequence number is odd
+# while the slot is being written and 2n + 2 once batch n is in it, so a reader can check it before
+# and after reading and throw the batch away if the writer came round and overwrote it meanwhile.
+#
+# A batch is a BATCH header, then an ACTIVE entry and the name of every code that's active, so each
+# one holds everything the display shows of its dolphin instance as of that poll. The display only
+# needs the newest batch of each instance and works out what changed by itself, which means the
+# writer can lap it without anything getting lost. If a batch it couldn't read might have been the
+# newest one of an instance, it asks the polling process to publish every instance again.
+
+RING_HEADER = Struct("<Q") # batches published
+SLOT = Struct("<QI") # sequence number, size of the batch
+BATCH = Struct("<HidfBH") # poller index, pid, poll time, current time, clock running, active count
+ACTIVE = Struct("<ffB") # time called, duration, name length
+
+SLOTS = 64
+SLOT_SIZE = 16384 # room for a few hundred codes being active at once
+
+
+class PollerProcessError(Exception):
+    """ The polling process quit while the display was still reading from it """
+
+
+class BatchRing(object):
+    """ A ring of batches in shared memory, written by one process and read by another """
+
+    # creates the ring, or attaches to the one with the given name
+    def __init__(self, name=None, slots=SLOTS, slot_size=SLOT_SIZE):
+        self.slots = slots
+        self.slot_size = slot_size
+        size = RING_HEADER.size + slots * slot_size
+        self.shm = shared_memory.SharedMemory(name, create=name is None, size=size if name is None else 0)
+        self.name = self.shm.name
+        self.buf = self.shm.buf
+        self.read_count = RING_HEADER.unpack_from(self.buf, 0)[0] # next batch to read
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+    # active_codes is a dict of (time called, duration) by name, like CodePoller.active_codes
+    @staticmethod
+    def encode(index, pid, poll_time, current_time, clock_running, active_codes) -> bytes:
+        data = bytearray(BATCH.pack(index, pid, poll_time, current_time, clock_running, len(active_codes)))
+        for name, (time_called, duration) in active_codes.items():
+            name = name.encode()
+            data += ACTIVE.pack(time_called, duration, len(name))
+            data += name
+        return data
+
+    # unpacks a batch straight from the slot it's in. a slot that was overwritten halfway through
+    # can hold anything, which raises struct.error or UnicodeDecodeError
+    @staticmethod
+    def decode(buf, position):
+        index, pid, poll_time, current_time, clock_running, active_count = BATCH.unpack_from(buf, position)
+        position += BATCH.size
+        active_codes = {}
+        for _ in range(active_count):
+            time_called, duration, length = ACTIVE.unpack_from(buf, position)
+            position += ACTIVE.size
+            active_codes[bytes(buf[position:position+length]).decode()] = (time_called, duration)
+            position += length
+        return index, pid, (poll_time, current_time, bool(clock_running), active_codes)
+
+    # writes a batch into the next slot
+    def publish(self, index, pid, poll_time, current_time, clock_running, active_codes):
+        data = self.encode(index, pid, poll_time, current_time, clock_running, active_codes)
+        if SLOT.size + len(data) > self.slot_size:
+            raise ValueError(f"a batch of {len(data)} bytes doesn't fit into a slot")
+
+        count = RING_HEADER.unpack_from(self.buf, 0)[0]
+        position = RING_HEADER.size + (count % self.slots) * self.slot_size
+        SLOT.pack_into(self.buf, position, 2 * count + 1, 0)
+        self.buf[position+SLOT.size:position+SLOT.size+len(data)] = data
+        SLOT.pack_into(self.buf, position, 2 * count + 2, len(data))
+        RING_HEADER.pack_into(self.buf, 0, count + 1)
+
+    # returns (index, pid, batch) of batch n, or None if the writer has overwritten it
+    def read_slot(self, n):
+        position = RING_HEADER.size + (n % self.slots) * self.slot_size
+        sequence, size = SLOT.unpack_from(self.buf, position)
+        if sequence != 2 * n + 2:
+            return None
+        try:
+            batch = self.decode(self.buf[position+SLOT.size:position+SLOT.size+size], 0)
+        except (struct.error, UnicodeDecodeError, IndexError):
+            return None
+        return batch if SLOT.unpack_from(self.buf, position)[0] == sequence else None
+
+    # returns a dict of (pid, batch) by poller index with the newest batch of every poller that
+    # published any since the last read, going from the newest batch back. the second thing it
+    # returns is whether the newest batch of one of them might have been lost, which can only
+    # happen once the writer laps the reader
+    def read(self, pollers) -> tuple:
+        newest = {}
+        count = RING_HEADER.unpack_from(self.buf, 0)[0]
+        oldest = max(self.read_count, count - self.slots)
+        lost = oldest > self.read_count
+        for n in range(count - 1, oldest - 1, -1):
+            if len(newest) == pollers:
+                break
+            batch = self.read_slot(n)
+            if batch is None:
+                # anything older could be out of date by this one
+                lost = True
+                break
+            index, pid, batch = batch
+            newest.setdefault(index, (pid, batch))
+        self.read_count = count
+        return newest, lost and len(newest) < pollers
+
+
+# a spawned process imports the main module of the one that started it before anything else, which
+# for the display would load all of Qt into the polling process. it only needs this module, so the
+# main module is hidden from multiprocessing while the process gets started
+@contextlib.contextmanager
+def main_module_hidden():
+    main = sys.modules["__main__"]
+    main_file = main.__dict__.pop("__file__", None)
+    main_spec = getattr(main, "__spec__", None)
+    main.__spec__ = None
+    try:
+        yield
+    finally:
+        main.__spec__ = main_spec
+        if main_file is not None:
+            main.__file__ = main_file
+
+
+# what runs in the polling process. it hooks the game itself, since a hooked Dolphin can't be
+# handed over from another process, and keeps trying until the game shows up or it gets stopped.
+# the progress of the hook goes back through conn as ("progress", message, fraction), followed by
+# ("done", error, pids hooked). the display sends
+# "stop", "idle", "active" or "resync" through commands, which asks for the newest batch of every
+# poller to get published again. the commands also cut the wait between polls short, which takes a
+# pipe rather than an Event, since setting an Event that a dead process was waiting on never returns
+def run_poller(ring_name, pid, all_instances, scheduler, record, conn, commands, published_event):
+    progress = lambda message, fraction: conn.send(("progress", message, fraction))
+    # nothing but a stop gets sent before the game is hooked
+    pollers, error = wait_for_chaos(pid, all_instances, scheduler, progress=progress, wait=commands.poll)
+    conn.send(("done", error, None if error is not None else [poller.memory.pid for poller in pollers]))
+    conn.close()
+    if error is not None:
+        return
+
+    ring = BatchRing(ring_name)
+    recorder = SessionRecorder(record)
+    if record is not None:
+        recorder.start(pollers[0])
+    multi_poller = MultiPoller(pollers)
+    last_batches = [None] * len(pollers) # (poll time, current time, clock running) of each poller's newest batch
+    running = True
+    try:
+        while running:
+            batches, interval = multi_poller.poll()
+            for index, (poll_time, current_time, clock_running, _, _) in batches:
+                last_batches[index] = (poll_time, current_time, clock_running)
+
+            resync = False
+            if commands.poll(interval / 1000):
+                # the display going away closes the pipe, which counts as a stop
+                try:
+                    while running and commands.poll():
+                        command = commands.recv()
+                        if command == "stop":
+                            running = False
+                        elif command == "resync":
+                            resync = True
+                        else:
+                            multi_poller.set_idle(command == "idle")
+                except EOFError:
+                    running = False
+            if resync:
+                batches = [(index, batch) for index, batch in enumerate(last_batches) if batch is not None]
+
+            for index, batch in batches:
+                ring.publish(index, pollers[index].memory.pid, *batch[:3], pollers[index].active_codes)
+            if batches:
+                published_event.set()
+    finally:
+        recorder.stop()
+        ring.close()
+
+
+class PollerProcess(object):
+    """ Stands in for a MultiPoller that runs in a process of its own """
+
+    # longest a poll waits for something to get published, which is also how long stopping the
+    # thread that polls this can take
+    WAIT = 0.1
+
+    def __init__(self, pid=None, all_instances=False, scheduler=None, record=None):
+        self.pid = pid
+        self.all_instances = all_instances
+        self.scheduler = scheduler
+        self.record = record
+        self.pids = [] # pid of the dolphin instance behind each poller index, as of the last batch
+        self.active_codes = [] # active codes of each poller index as of the last batch
+        self.ring = None
+        self.process = None
+        self.commands = None
+        self.cancelled = False
+
+    # starts the polling process and waits for it to hook the game, passing on its progress to
+    # progress like wait_for_chaos does. returns an error message if it couldn't or got cancelled.
+    # the process gets spawned rather than forked so it doesn't inherit the state of Qt or the
+    # threads of the display
+    def start(self, progress=None):
+        context = multiprocessing.get_context("spawn")
+        self.published_event = context.Event()
+        self.ring = BatchRing()
+        conn, child_conn = context.Pipe(duplex=False)
+        child_commands, self.commands = context.Pipe(duplex=False)
+        self.process = context.Process(target=run_poller, daemon=True, args=(
+            self.ring.name, self.pid, self.all_instances, self.scheduler, self.record, child_conn,
+            child_commands, self.published_event))
+        with main_module_hidden():
+            self.process.start()
+        child_conn.close()
+        child_commands.close()
+        if self.cancelled:
+            self.send("stop")
+        try:
+            message = conn.recv()
+            while message[0] == "progress":
+                if progress is not None:
+                    progress(*message[1:])
+                message = conn.recv()
+            _, error, pids = message
+        except EOFError:
+            error, pids = "The polling process quit before hooking the game!", None
+        conn.close()
+        if error is not None:
+            self.stop()
+            return error
+        self.pids = pids
+        self.active_codes = [{} for _ in pids]
+        return None
+
+    # waits up to WAIT seconds for batches to get published and returns them like MultiPoller.poll
+    # does, with no wait before the next call. raises PollerProcessError if the polling process
+    # has quit, since the codes wouldn't change anymore
+    def poll(self):
+        if self.ring is None:
+            return [], 0.0
+        if not self.process.is_alive():
+            raise PollerProcessError(f"The polling process quit unexpectedly with exit code {self.process.exitcode}!")
+        if not self.published_event.wait(self.WAIT):
+            return [], 0.0
+        self.published_event.clear()
+        newest, lost = self.ring.read(len(self.pids))
+        if lost:
+            self.send("resync")
+
+        batches = []
+        for index, (pid, (poll_time, current_time, clock_running, active_codes)) in sorted(newest.items()):
+            last_active_codes = self.active_codes[index]
+            changed_codes = [
+                (name, time_called, duration) for name, (time_called, duration) in active_codes.items()
+                if last_active_codes.get(name) != (time_called, duration)
+            ]
+            removed_codes = [name for name in last_active_codes if name not in active_codes]
+            self.pids[index] = pid
+            self.active_codes[index] = active_codes
+            batches.append((index, (poll_time, current_time, clock_running, changed_codes, removed_codes)))
+        return batches, 0.0
+
+    # a process that has quit can't take commands anymore, which poll finds out about by itself
+    def send(self, command):
+        try:
+            self.commands.send(command)
+        except OSError:
+            pass
+
+    # gives up on hooking the game while start is waiting for it, from another thread
+    def cancel(self):
+        self.cancelled = True
+        if self.commands is not None:
+            self.send("stop")
+
+    def set_idle(self, idle):
+        if self.process is not None:
+            self.send("idle" if idle else "active")
+
+    def stop(self):
+        if self.process is not None:
+            self.send("stop")
+            self.process.join(1.0)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+            self.commands.close()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring.unlink()
+            self.ring = None
@@ -0,0 +1,349 @@
+from ChaosCodes import LAYOUTS
+from DolphinMemoryLib import Dolphin
+from struct import Struct
+import bisect
+import json
+import os
+import threading
+import time
+
+# Records a whole chaos session to disk and plays it back later without an emulator.
+#
+# A recording is an append-only log of records, each one a RECORD header followed by its payload:
+#   SETUP     json describing where everything lives in memory, along with the bytes of the few
+#             regions that stay the same while the game is hooked (disc header, chaosPtrs, unique
+#             string). the log starts with one, and gets another whenever the poller follows the
+#             code list somewhere else or hooks the game anew, which applies to every frame after it
+#   KEYFRAME  the whole code list as raw bytes
+#   DELTA     only the runs of words of the code list that changed since the previous frame, each
+#             one a RUN header followed by the new bytes
+# Every frame holds the session time, which is the seconds since recording started, and the game
+# time. A keyframe gets written every KEYFRAME_INTERVAL seconds and whenever the code count changes,
+# and the session time and file offset of each one is appended to a .idx file next to the log, so
+# seeking is a binary search for the nearest keyframe and then a few deltas. Every setup after the
+# first one goes into the index as well, and is always followed by a keyframe.
+
+MAGIC = b"HCSR"
+VERSION = 2 # recordings of version 1 only ever have the setup at the start
+FILE_HEADER = Struct(">4sH")
+RECORD = Struct(">BdfI") # type, session time, game time, payload size
+RUN = Struct(">II") # offset into the code list, size
+INDEX_ENTRY = Struct(">dQ") # session time, file offset of a keyframe or setup
+
+SETUP = 0
+KEYFRAME = 1
+DELTA = 2
+
+KEYFRAME_INTERVAL = 10.0
+
+# compares two equally sized code lists and returns (offset, size) of every run of changed words.
+# the lists are compared in chunks first so the unchanged parts get skipped quickly
+def diff_runs(old: bytes, new: bytes, chunk: int=64) -> list:
+    runs = []
+    for start in range(0, len(new), chunk):
+        if old[start:start+chunk] == new[start:start+chunk]:
+            continue
+        for offset in range(start, min(start + chunk, len(new)), 4):
+            if old[offset:offset+4] != new[offset:offset+4]:
+                if runs and runs[-1][0] + runs[-1][1] == offset:
+                    runs[-1][1] += 4
+                else:
+                    runs.append([offset, 4])
+    return runs
+
+
+class SessionRecorder(object):
+    """ Writes every snapshot CodePoller takes to a recording """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.index_file = None
+        self.start_time = None
+        self.last_keyframe = None
+        self.last_data = None
+        self.last_time = None
+        self.lock = threading.Lock() # the recording can be stopped from another thread than the poller's
+
+    def start(self, poller):
+        """ Start a new recording of the game the poller is hooked to """
+        self.file = open(self.path, "wb")
+        self.index_file = open(self.path + ".idx", "wb")
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        self.write_setup(poller, 0.0)
+        poller.recorder = self
+
+    def update_setup(self, poller):
+        """ Carry on from where the poller finds everything now, after it re-resolved its pointers """
+        with self.lock:
+            if self.file is not None:
+                session_time = 0.0 if self.start_time is None else time.perf_counter() - self.start_time
+                self.index_file.write(INDEX_ENTRY.pack(session_time, self.file.tell()))
+                self.index_file.flush()
+                self.write_setup(poller, session_time)
+                self.file.flush()
+
+    # the frame after a setup is always a keyframe, since the code list it's compared against
+    # could be anywhere else now
+    def write_setup(self, poller, session_time):
+        memory = poller.memory
+        layout = poller.layout
+        string_addr = memory.read_u32(poller.chaos_ptrs + layout.unique_string_ptr_offset)
+        regions = [
+            (Dolphin.MEM_START, memory.read_block(Dolphin.MEM_START, 0x20)),
+            (poller.chaos_ptrs, memory.read_block(poller.chaos_ptrs, layout.chaos_ptrs_size)),
+            (string_addr, memory.read_block(string_addr, len(layout.unique_string) + 1)),
+        ]
+        setup = {
+            "unique_string": layout.unique_string,
+            "code_container": poller.code_container,
+            "code_list": poller.code_list,
+            "current_time": poller.current_time,
+            "regions": [[addr, data.hex()] for addr, data in regions],
+        }
+        self.write_record(SETUP, session_time, 0.0, json.dumps(setup).encode())
+        self.last_data = None
+
+    def stop(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.index_file.close()
+                self.file = None
+                self.index_file = None
+
+    def write_record(self, record_type, session_time, game_time, payload):
+        self.file.write(RECORD.pack(record_type, session_time, game_time, len(payload)))
+        self.file.write(payload)
+
+    def record(self, poll_time, current_time, data):
+        """ Add a snapshot to the recording, unless nothing changed since the last one """
+        with self.lock:
+            if self.file is not None and (data != self.last_data or current_time != self.last_time):
+                self.write_frame(poll_time, current_time, data)
+
+    def write_frame(self, poll_time, current_time, data):
+        if self.start_time is None:
+            self.start_time = poll_time
+        session_time = poll_time - self.start_time
+
+        if (self.last_data is None or len(data) != len(self.last_data) or
+                session_time - self.last_keyframe >= KEYFRAME_INTERVAL):
+            self.index_file.write(INDEX_ENTRY.pack(session_time, self.file.tell()))
+            self.index_file.flush()
+            self.write_record(KEYFRAME, session_time, current_time, data)
+            self.last_keyframe = session_time
+        else:
+            payload = bytearray()
+            for offset, size in diff_runs(self.last_data, data):
+                payload += RUN.pack(offset, size)
+                payload += data[offset:offset+size]
+            self.write_record(DELTA, session_time, current_time, payload)
+        self.file.flush()
+
+        self.last_data = data
+        self.last_time = current_time
+
+
+class SessionReplayer(object):
+    """ Plays a recording back into a buffer that a Dolphin can read from like the real game """
+
+    def __init__(self, path, speed=1.0, loop=False):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+
+        self.file = open(path, "rb")
+        magic, version = FILE_HEADER.unpack(self.file.read(FILE_HEADER.size))
+        if magic != MAGIC or not 1 <= version <= VERSION:
+            raise ValueError(f"{path} isn't a recording this version can play")
+
+        record_type, _, _, payload = self.read_record()
+        if record_type != SETUP:
+            raise ValueError(f"{path} doesn't start with a setup record")
+        setup = json.loads(payload)
+        self.setups = [(FILE_HEADER.size, setup, self.layout_of(setup))] # (file offset, setup, layout) of every setup
+        self.first_frame = self.file.tell()
+        self.index = self.load_index()
+        self.load_setups()
+        self.setup_offsets = [offset for offset, _, _ in self.setups]
+
+        self.memory = None
+        self.setup = setup
+        self.layout = self.setups[0][2]
+        self.data = bytearray()
+        self.session_time = 0.0
+        self.thread = None
+        self.running = False
+
+    def read_record(self):
+        """ Read the next record, or return None for the type at the end of the log """
+        header = self.file.read(RECORD.size)
+        if len(header) < RECORD.size:
+            return None, 0.0, 0.0, b""
+        record_type, session_time, game_time, size = RECORD.unpack(header)
+        payload = self.file.read(size)
+        if len(payload) < size:
+            return None, 0.0, 0.0, b""
+        return record_type, session_time, game_time, payload
+
+    def layout_of(self, setup):
+        # recordings from before there were several layouts are all of the first one
+        unique_string = setup.get("unique_string", "CHAOS 1.0")
+        if unique_string not in LAYOUTS:
+            raise ValueError(f"{self.path} was recorded from {unique_string}, which has no known layout")
+        return LAYOUTS[unique_string]
+
+    # loads the index of keyframes and later setups, or rebuilds it from the log if it's missing,
+    # like when the recording was copied without it
+    def load_index(self):
+        index = []
+        try:
+            with open(self.path + ".idx", "rb") as f:
+                data = f.read()
+            # a recording that got cut off can end with half an entry
+            index = list(INDEX_ENTRY.iter_unpack(data[:len(data) - len(data) % INDEX_ENTRY.size]))
+        except OSError:
+            self.file.seek(self.first_frame)
+            while True:
+                offset = self.file.tell()
+                header = self.file.read(RECORD.size)
+                if len(header) < RECORD.size:
+                    break
+                record_type, session_time, _, size = RECORD.unpack(header)
+                if record_type in (KEYFRAME, SETUP):
+                    index.append((session_time, offset))
+                self.file.seek(size, os.SEEK_CUR)
+        self.index_times = [session_time for session_time, _ in index]
+        return index
+
+    # reads the setups the index points to, which are the ones after the first
+    def load_setups(self):
+        for _, offset in self.index:
+            self.file.seek(offset)
+            record_type, _, _, payload = self.read_record()
+            if record_type == SETUP:
+                setup = json.loads(payload)
+                self.setups.append((offset, setup, self.layout_of(setup)))
+
+    def use_setup(self, setup, layout):
+        self.setup = setup
+        self.layout = layout
+        if self.memory is not None:
+            for addr, data in setup["regions"]:
+                self.memory.write_ram(addr - Dolphin.MEM_START, bytes.fromhex(data))
+
+    def attach(self, memory: Dolphin):
+        """ Point a Dolphin at a fresh copy of MEM1 holding the recorded game """
+        self.memory = memory
+        memory.attach_buffer(bytearray(Dolphin.MEM_END - Dolphin.MEM_START))
+        self.seek(0.0)
+
+    def apply(self, record_type, game_time, payload):
+        if record_type == SETUP:
+            setup = json.loads(payload)
+            self.use_setup(setup, self.layout_of(setup))
+            return
+        if record_type == KEYFRAME:
+            self.data = bytearray(payload)
+        else:
+            position = 0
+            while position < len(payload):
+                offset, size = RUN.unpack_from(payload, position)
+                position += RUN.size
+                self.data[offset:offset+size] = payload[position:position+size]
+                position += size
+
+        self.memory.write_u32(self.setup["code_container"] + self.layout.current_code_count_offset, len(self.data) // self.layout.code_size)
+        self.memory.write_ram(self.setup["code_list"] - Dolphin.MEM_START, self.data)
+        self.memory.write_f32(self.setup["current_time"], game_time)
+
+    def seek(self, session_time):
+        """ Jump to the state of the game at the given session time """
+        i = bisect.bisect_right(self.index_times, session_time) - 1
+        start = self.index[max(i, 0)][1] if self.index else self.first_frame
+        # the frames from there on go to wherever the last setup before them said
+        _, setup, layout = self.setups[bisect.bisect_right(self.setup_offsets, start) - 1]
+        self.use_setup(setup, layout)
+        self.file.seek(start)
+        keyframe = False # whether a keyframe has been applied yet, which a seek always goes up to
+        while True:
+            offset = self.file.tell()
+            record_type, frame_time, game_time, payload = self.read_record()
+            if record_type is None or (frame_time > session_time and keyframe):
+                self.file.seek(offset)
+                break
+            self.apply(record_type, game_time, payload)
+            self.session_time = frame_time
+            keyframe = keyframe or record_type != SETUP
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        """ Apply every frame when its time comes round, speed times faster than it was recorded """
+        start_wall = time.perf_counter()
+        start_session = self.session_time
+        while self.running:
+            offset = self.file.tell()
+            record_type, frame_time, game_time, payload = self.read_record()
+            if record_type is None:
+                if not self.loop:
+                    break
+                self.seek(0.0)
+                start_wall = time.perf_counter()
+                start_session = self.session_time
+                continue
+
+            wait = (frame_time - start_session) / self.speed - (time.perf_counter() - start_wall)
+            while wait > 0 and self.running:
+                time.sleep(min(wait, 0.1))
+                wait = (frame_time - start_session) / self.speed - (time.perf_counter() - start_wall)
+            if not self.running:
+                self.file.seek(offset)
+                break
+
+            self.apply(record_type, game_time, payload)
+            self.session_time = frame_time
+
+    def duration(self):
+        """ Session time of the last frame in the recording """
+        position = self.file.tell()
+        self.file.seek(self.index[-1][1] if self.index else self.first_frame)
+        session_time = 0.0
+        while True:
+            record_type, frame_time, _, _ = self.read_record()
+            if record_type is None:
+                break
+            session_time = frame_time
+        self.file.seek(position)
+        return session_time
+
+
+# plays a recording into a new Dolphin and returns it along with the replayer driving it
+def open_replay(path, speed=1.0, loop=False):
+    replayer = SessionReplayer(path, speed, loop)
+    memory = Dolphin()
+    replayer.attach(memory)
+    return memory, replayer
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Show a summary of a recorded session")
+    parser.add_argument("path", help="recording to look at")
+    args = parser.parse_args()
+
+    replayer = SessionReplayer(args.path)
+    print(f"Keyframes: {len(replayer.index) - len(replayer.setups) + 1}")
+    print(f"Setups: {len(replayer.setups)}")
+    print(f"Length: {replayer.duration():.1f}s")
+    print(f"Size: {os.path.getsize(args.path)} bytes")
@@ -0,0 +1,199 @@
+from PerfStats import Histogram
+import csv
+import json
+import math
+import threading
+import time
+
+# Statistics of the codes that got activated over a session, for showing on stream or looking at
+# afterwards. They're built up from what the poller already reads each poll, and only ever kept as
+# counters, running moments and fixed histograms, so a ten hour marathon takes up as much memory as
+# a ten minute run. All times are in seconds of game time, which stands still while the game is
+# paused.
+
+# upper bounds of the buckets for how long a code stayed active, in seconds
+ACTIVE_BUCKETS = (5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600)
+# how many codes at once the time spent at each number of active codes gets kept for. everything
+# past it goes into the last one
+MAX_CONCURRENCY = 32
+
+CSV_COLUMNS = ("pid", "kind", "name", "rarity", "activations", "active_seconds", "mean_active_seconds")
+
+
+class RunningMoments(object):
+    """ Count, mean, variance and range of a series of values, without keeping them """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0 # sum of squared differences from the mean
+        self.min = math.inf
+        self.max = -math.inf
+
+    # welford's method, which stays accurate however many values get added
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def stddev(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.mean * self.count,
+            "mean": self.mean,
+            "stddev": self.stddev(),
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+        }
+
+
+class SessionStats(object):
+    """ Activations and active times of every code over a session """
+
+    # updated from the polling thread and read from wherever they get shown or exported, so both
+    # go through the lock
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.codes = {} # name -> [rarity, activations, seconds active]
+        self.rarities = {} # rarity -> [activations, seconds active]
+        self.active = {} # name -> (time called, rarity) of every code active right now
+        self.active_times = RunningMoments() # how long each activation lasted
+        self.active_histogram = Histogram(ACTIVE_BUCKETS)
+        self.concurrency_times = [0.0] * (MAX_CONCURRENCY + 1) # seconds spent with each number of codes active
+        self.peak_concurrency = 0
+        self.peak_time = None # game time the peak was first reached
+        self.longest_gap = 0.0 # longest stretch without any code active
+        self.gap_start = None # game time the current stretch without any code started
+        self.last_time = None
+
+    def start_code(self, name, time_called, rarity):
+        self.active[name] = (time_called, rarity)
+        code = self.codes.setdefault(name, [rarity, 0, 0.0])
+        code[1] += 1
+        self.rarities.setdefault(rarity, [0, 0.0])[0] += 1
+
+    def end_code(self, name, end_time):
+        time_called, rarity = self.active.pop(name)
+        active_time = max(0.0, end_time - time_called)
+        self.codes[name][2] += active_time
+        self.rarities[rarity][1] += active_time
+        self.active_times.add(active_time)
+        self.active_histogram.record(active_time)
+
+    def end_gap(self, end_time):
+        if self.gap_start is not None:
+            self.longest_gap = max(self.longest_gap, end_time - self.gap_start)
+            self.gap_start = None
+
+    # takes what changed in a poll, the same as in a batch from CodePoller.poll, along with a dict
+    # of catalog entries by name to look up the rarities in. a code whose timer changed while it
+    # was active counts as activated again
+    def update(self, current_time, changed_codes, removed_codes, entries):
+        with self.lock:
+            if self.last_time is not None and current_time < self.last_time:
+                # the game was restarted and its clock started over
+                if self.gap_start is not None:
+                    self.gap_start = current_time
+                for name in self.active:
+                    self.active[name] = (current_time, self.active[name][1])
+            elif self.last_time is not None:
+                concurrency = min(len(self.active), MAX_CONCURRENCY)
+                self.concurrency_times[concurrency] += current_time - self.last_time
+            elif not self.active:
+                self.gap_start = current_time
+            self.last_time = current_time
+
+            for name in removed_codes:
+                if name in self.active:
+                    self.end_code(name, current_time)
+            for name, time_called, duration in changed_codes:
+                active = self.active.get(name)
+                if active is not None and active[0] == time_called:
+                    continue
+                if active is not None:
+                    self.end_code(name, time_called)
+                elif not self.active:
+                    self.end_gap(time_called)
+                entry = entries.get(name)
+                self.start_code(name, time_called, entry.rarity if entry is not None else None)
+
+            if not self.active and self.gap_start is None:
+                self.gap_start = current_time
+            if len(self.active) > self.peak_concurrency:
+                self.peak_concurrency = len(self.active)
+                self.peak_time = current_time
+
+    # the seconds active of each code and rarity include the codes that are still active, while
+    # the moments and histogram of active_seconds only cover activations that have ended
+    def to_dict(self) -> dict:
+        with self.lock:
+            longest_gap = self.longest_gap
+            if self.gap_start is not None and self.last_time is not None:
+                longest_gap = max(longest_gap, self.last_time - self.gap_start)
+            codes = {name: list(code) for name, code in self.codes.items()}
+            rarities = {rarity: list(totals) for rarity, totals in self.rarities.items()}
+            for name, (time_called, rarity) in self.active.items():
+                active_time = max(0.0, self.last_time - time_called)
+                codes[name][2] += active_time
+                rarities[rarity][1] += active_time
+            return {
+                "start_time": self.start_time,
+                "game_time": self.last_time,
+                "activations": sum(activations for _, activations, _ in self.codes.values()),
+                "active_now": len(self.active),
+                "active_seconds": self.active_times.to_dict(),
+                "active_histogram": self.active_histogram.to_dict(),
+                "peak_concurrency": self.peak_concurrency,
+                "peak_time": self.peak_time,
+                "concurrency_seconds": list(self.concurrency_times),
+                "longest_gap": longest_gap,
+                "codes": {
+                    name: {"rarity": rarity, "activations": activations, "active_seconds": active_time}
+                    for name, (rarity, activations, active_time) in codes.items()
+                },
+                "rarities": {
+                    str(rarity): {"activations": activations, "active_seconds": active_time}
+                    for rarity, (activations, active_time) in rarities.items()
+                },
+            }
+
+    def summary(self) -> str:
+        """ A few lines for the session panel """
+        data = self.to_dict()
+        top = sorted(data["codes"].items(), key=lambda item: item[1]["activations"], reverse=True)[:3]
+        return (f"{data['activations']} activations, {data['active_seconds']['mean']:.1f}s active on average\n"
+                f"peak of {data['peak_concurrency']} codes at once, longest gap {data['longest_gap']:.1f}s\n"
+                f"most activated: " + ", ".join(f"{name} ({code['activations']})" for name, code in top))
+
+    def csv_rows(self, pid) -> list:
+        """ A row per code and per rarity, in the order of CSV_COLUMNS """
+        data = self.to_dict()
+        rows = []
+        for name, code in sorted(data["codes"].items()):
+            rows.append((pid, "code", name, code["rarity"], code["activations"], code["active_seconds"],
+                         code["active_seconds"] / code["activations"]))
+        for rarity, totals in sorted(data["rarities"].items()):
+            rows.append((pid, "rarity", "", rarity, totals["activations"], totals["active_seconds"],
+                         totals["active_seconds"] / totals["activations"]))
+        return rows
+
+
+# writes the stats of every hooked dolphin instance, given as (pid, SessionStats) pairs. a path
+# ending in .csv gets a table of every code and rarity, anything else all of the stats as json
+def export_session_stats(path, sessions):
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_COLUMNS)
+            for pid, session in sessions:
+                writer.writerows(session.csv_rows(pid))
+    else:
+        with open(path, "w") as f:
+            json.dump([dict(pid=pid, **session.to_dict()) for pid, session in sessions], f, indent=2)